@@ -0,0 +1,36 @@
+"""
+Row-wise get_clean_mpns / get_clean_model_nos against the column-wise extract_attribute_lists.
+
+    python -m benchmarks.bench_attributes --rows 200000 2000000
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import (
+    extract_attribute_lists,
+    get_clean_model_nos,
+    get_clean_mpns,
+)
+
+
+def _time(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[200000, 2000000])
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        df = make_mumford_export(n_rows)
+        row_wise = _time(lambda: (df.apply(get_clean_mpns, axis=1), df.apply(get_clean_model_nos, axis=1)))
+        column_wise = _time(lambda: extract_attribute_lists(df['attrs']))
+        print(f"rows={n_rows:>9,}  row-wise={row_wise:8.2f}s  column-wise={column_wise:8.2f}s  speedup={row_wise / column_wise:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
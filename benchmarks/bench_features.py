@@ -0,0 +1,50 @@
+"""
+Throughput of the row-wise feature code against the batched feature engine, in pairs per second.
+
+    python -m benchmarks.bench_features --rows 20000 200000 --n-jobs 16
+    python -m benchmarks.bench_features --rows 100000 --recurrence 5 --skip-row-wise
+
+--recurrence repeats every candidate group under new ids, like products that recur across production exports.
+"""
+import argparse
+import time
+import warnings
+
+import pandas as pd
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import compute_feature_matrix_parallel
+from src.cms_auto_approval.pipelines.data_science_mumford_data.nodes import get_features_row_wise
+
+warnings.filterwarnings('ignore')
+
+
+def _time(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[20000, 200000], help='raw export rows')
+    parser.add_argument('--n-jobs', type=int, default=1, help='feature engine worker processes')
+    parser.add_argument('--recurrence', type=int, default=1, help='times each candidate group appears')
+    parser.add_argument('--skip-row-wise', action='store_true')
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        pairs = preprocess_mumford_data(make_mumford_export(n_rows))
+        groups = pairs['matching_engine_candidate_id']
+        pairs = pd.concat([pairs.assign(matching_engine_candidate_id=groups + k * n_rows) for k in range(args.recurrence)])
+        engine = _time(lambda: compute_feature_matrix_parallel(pairs, n_jobs=args.n_jobs))
+        line = f"pairs={len(pairs):>9,}  engine={len(pairs) / engine:>12,.0f} rows/s"
+        if not args.skip_row_wise:
+            row_wise = _time(lambda: get_features_row_wise(pairs.copy()))
+            line += f"  row-wise={len(pairs) / row_wise:>10,.0f} rows/s  speedup={row_wise / engine:6.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
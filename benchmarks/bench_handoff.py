@@ -0,0 +1,64 @@
+"""
+Save / load time and size of the data engineering output as CSV against the partitioned Parquet dataset.
+
+    python -m benchmarks.bench_handoff --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.extras.datasets.parquet_partitions import read_partitions, write_partitions
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import INPUT_COLUMNS
+
+warnings.filterwarnings('ignore')
+
+
+def _time(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def _size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[200000], help='raw export rows')
+    args = parser.parse_args()
+
+    columns = INPUT_COLUMNS + ['decision']
+    for n_rows in args.rows:
+        pairs = preprocess_mumford_data(make_mumford_export(n_rows))
+        with tempfile.TemporaryDirectory() as tmp:
+            csv, parquet = os.path.join(tmp, 'pairs.csv'), os.path.join(tmp, 'pairs')
+            results = {
+                'csv': (
+                    _time(lambda: pairs.to_csv(csv, index=False)),
+                    _time(lambda: pd.read_csv(csv)),
+                    _time(lambda: pd.read_csv(csv, usecols=columns)),
+                    _size(csv),
+                ),
+                'parquet': (
+                    _time(lambda: write_partitions(pairs, parquet)),
+                    _time(lambda: read_partitions(parquet)),
+                    _time(lambda: read_partitions(parquet, columns=columns)),
+                    _size(parquet),
+                ),
+            }
+        print(f"pairs={len(pairs):,}")
+        for name, (save, load, projected, size) in results.items():
+            print(f"  {name:<8} save={save:6.2f}s  load={load:6.2f}s  load training columns={projected:6.2f}s  size={size / 1e6:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
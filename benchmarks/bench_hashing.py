@@ -0,0 +1,55 @@
+"""
+Time of hashing the data engineering output for the Flyte cache, in each mode of hash_dataframe
+and, when hashable_df is installed, with the previous hashable_df based hash.
+
+    python -m benchmarks.bench_hashing --rows 200000
+"""
+import argparse
+import time
+import tracemalloc
+import warnings
+
+import pandas as pd
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.hashing import FULL, METADATA, SAMPLED, hash_dataframe
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+
+warnings.filterwarnings('ignore')
+
+
+def _measure(func) -> tuple:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    # Memory is measured on a second run, tracing slows the hashing down several times.
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[200000], help='raw export rows')
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        pairs = preprocess_mumford_data(make_mumford_export(n_rows))
+        methods = {mode: lambda mode=mode: hash_dataframe(pairs, mode=mode) for mode in (FULL, SAMPLED, METADATA)}
+        try:
+            from hashable_df import hashable_df
+            methods['hashable_df'] = lambda: str(pd.util.hash_pandas_object(hashable_df(pairs)))
+        except ImportError:
+            pass
+
+        print(f'{n_rows} rows, {len(pairs)} pairs')
+        for name, method in methods.items():
+            elapsed, peak = _measure(method)
+            print(f'  {name:12s} {elapsed:8.3f}s  peak {peak / 2 ** 20:8.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
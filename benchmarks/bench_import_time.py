@@ -0,0 +1,77 @@
+"""
+Cold-start import time of the Flyte task and pipeline modules, each imported in a fresh interpreter as Flyte
+does when it registers the workflows and when a task container starts. Also lists the heavy dependencies that
+each import loads.
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --baseline HEAD~1     # compared with the modules of another commit
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+MODULES = [
+    'src.tasks.hello',
+    'src.cms_auto_approval.run',
+    'src.workflows',
+    'src.cms_auto_approval.pipelines.data_science_mumford_data.nodes',
+]
+HEAVY = ['boto3', 'sklearn', 'scipy', 'skl2onnx', 'onnxruntime']
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps([time.perf_counter() - start, [m for m in {heavy} if m in sys.modules]]))
+'''
+
+
+def import_time(module: str, root: str = ROOT, repeat: int = 5) -> tuple:
+    """
+    The fastest of repeat imports of module, each in a new interpreter run from root, and the HEAVY
+    dependencies it loaded.
+    """
+    best, heavy = float('inf'), []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-c', _IMPORT.format(module=module, heavy=HEAVY)], cwd=root, stderr=subprocess.DEVNULL, text=True,
+        )
+        seconds, heavy = json.loads(output.splitlines()[-1])
+        best = min(best, seconds)
+    return best, heavy
+
+
+def _checkout(revision: str, directory: str) -> str:
+    # Only src is needed to import the modules, git archive avoids touching the working tree.
+    archive = os.path.join(directory, 'src.tar')
+    subprocess.check_call(['git', 'archive', '--format=tar', '-o', archive, revision, 'src'], cwd=ROOT)
+    with tarfile.open(archive) as tar:
+        tar.extractall(directory)
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', help='git revision to compare with')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        baseline_root = _checkout(args.baseline, directory) if args.baseline else None
+        for module in args.modules:
+            seconds, heavy = import_time(module, repeat=args.repeat)
+            line = f'{module:65s} {seconds:7.3f}s  loads {", ".join(heavy) or "-"}'
+            if baseline_root:
+                baseline_seconds, baseline_heavy = import_time(module, baseline_root, args.repeat)
+                line += f'  |  {args.baseline}: {baseline_seconds:7.3f}s  loads {", ".join(baseline_heavy) or "-"}'
+            print(line, flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Throughput and latency of concurrent single-group requests, scored one at a time against micro-batched.
+
+    python -m benchmarks.bench_micro_batching --requests 500 --group-size 10
+"""
+import argparse
+import asyncio
+import time
+import warnings
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.inference import OnlineScorer
+from src.cms_auto_approval.micro_batching import MicroBatchScorer
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import compute_feature_matrix
+from src.cms_auto_approval.pipelines.data_science_mumford_data.scoring import export_onnx
+
+warnings.filterwarnings('ignore')
+
+
+async def _timed(score, groups) -> float:
+    start = time.perf_counter()
+    await score(groups)
+    return time.perf_counter() - start
+
+
+async def _run(score, requests) -> tuple:
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(_timed(score, groups) for groups in requests))
+    return time.perf_counter() - start, np.percentile(latencies, [50, 99]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help='concurrent requests')
+    parser.add_argument('--group-size', type=int, default=10, help='candidates per group')
+    parser.add_argument('--max-batch-sizes', type=int, nargs='+', default=[256, 2048])
+    parser.add_argument('--max-wait', type=float, default=0.005, help='seconds')
+    args = parser.parse_args()
+
+    training = preprocess_mumford_data(make_mumford_export(20000))
+    model = GradientBoostingClassifier(n_estimators=100, max_depth=5, random_state=2)
+    model.fit(compute_feature_matrix(training), training['decision'])
+    scorer = OnlineScorer(export_onnx(model))
+    size = args.group_size + 1
+    requests = [make_mumford_export(size, seed=i, group_size=size).drop(columns='decision') for i in range(args.requests)]
+
+    async def one_at_a_time(groups):
+        # Scores each request as it arrives, on the event loop's default thread pool.
+        return await asyncio.get_running_loop().run_in_executor(None, scorer.score, groups)
+
+    results = {'one at a time': asyncio.run(_run(one_at_a_time, requests))}
+    for max_batch_size in args.max_batch_sizes:
+        async def batched():
+            batcher = MicroBatchScorer(scorer, max_batch_size=max_batch_size, max_wait=args.max_wait)
+            result = await _run(batcher.score, requests)
+            await batcher.close()
+            return result
+        results[f'batches of {max_batch_size}'] = asyncio.run(batched())
+
+    for name, (elapsed, (p50, p99)) in results.items():
+        print(f'  {name:18s} {args.requests / elapsed:8.0f} requests/s  p50 {p50:8.1f} ms  p99 {p99:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
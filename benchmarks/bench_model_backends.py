@@ -0,0 +1,51 @@
+"""
+Fit time and promotion_check metrics of each model backend on the same synthetic feature matrix.
+
+    python -m benchmarks.bench_model_backends --rows 200000
+"""
+import argparse
+import time
+import warnings
+
+import pandas as pd
+from sklearn.model_selection import GroupShuffleSplit
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import FEATURE_COLUMNS, compute_feature_matrix
+from src.cms_auto_approval.pipelines.data_science_mumford_data.models import BACKENDS, fit_backend
+from src.cms_auto_approval.pipelines.data_science_mumford_data.evaluation import evaluate
+from src.cms_auto_approval.pipelines.data_science_mumford_data.nodes import PRECISION_MODIFIER
+
+warnings.filterwarnings('ignore')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000, help='raw export rows')
+    parser.add_argument('--n-threads', type=int, default=None)
+    args = parser.parse_args()
+
+    pairs = preprocess_mumford_data(make_mumford_export(args.rows))
+    features = compute_feature_matrix(pairs)
+    labels, groups = pairs['decision'].to_numpy(), pairs['matching_engine_candidate_id'].to_numpy()
+    # The same split as fit_model.
+    train_inds, test_inds = next(GroupShuffleSplit(test_size=.5, n_splits=2, random_state=7).split(features, groups=groups))
+    x_train = pd.DataFrame(features[train_inds], columns=FEATURE_COLUMNS)
+    x_test = pd.DataFrame(features[test_inds], columns=FEATURE_COLUMNS)
+
+    print(f'{len(pairs)} pairs')
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        model = fit_backend(backend, x_train, labels[train_inds], groups[train_inds], n_threads=args.n_threads)
+        elapsed = time.perf_counter() - start
+
+        evaluation = evaluate(model, x_test, labels[test_inds])
+        print(
+            f'  {backend:24s} fit {elapsed:8.2f}s  log loss {evaluation.log_loss:.4f}'
+            f'  calibrated precision {evaluation.precision + PRECISION_MODIFIER:.4f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
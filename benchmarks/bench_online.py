@@ -0,0 +1,48 @@
+"""
+Latency of OnlineScorer.score on single candidate groups, from raw export rows to decisions.
+Reports p50 / p99 per group size.
+
+    python -m benchmarks.bench_online --sizes 1 10 50 100 250 500 --repeats 200
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.inference import OnlineScorer
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import compute_feature_matrix
+from src.cms_auto_approval.pipelines.data_science_mumford_data.scoring import export_onnx
+
+warnings.filterwarnings('ignore')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50, 100, 250, 500], help='candidates per group')
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    training = preprocess_mumford_data(make_mumford_export(20000))
+    model = GradientBoostingClassifier(n_estimators=100, max_depth=5, random_state=2)
+    model.fit(compute_feature_matrix(training), training['decision'])
+    scorer = OnlineScorer(export_onnx(model))
+
+    for size in args.sizes:
+        # One lead plus size candidates.
+        group = make_mumford_export(size + 1, seed=size, group_size=size + 1)
+        scorer.score(group)  # warm up
+        latencies = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            scorer.score(group)
+            latencies.append(time.perf_counter() - start)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f'  group of {size:4d}  p50 {p50:7.2f} ms  p99 {p99:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Throughput of scoring pairs with the exported ONNX model, one session call per pair against batched calls.
+
+    python -m benchmarks.bench_scoring --rows 20000
+"""
+import argparse
+import time
+import warnings
+
+from sklearn.ensemble import GradientBoostingClassifier
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import compute_feature_matrix
+from src.cms_auto_approval.pipelines.data_science_mumford_data.scoring import OnnxScorer, export_onnx
+
+warnings.filterwarnings('ignore')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='raw export rows')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 1024, 65536])
+    args = parser.parse_args()
+
+    pairs = preprocess_mumford_data(make_mumford_export(args.rows))
+    features = compute_feature_matrix(pairs)
+    model = GradientBoostingClassifier(n_estimators=100, max_depth=5, random_state=2).fit(features, pairs['decision'])
+    model_bytes = export_onnx(model)
+
+    print(f'{len(pairs)} pairs')
+    for batch_size in args.batch_sizes:
+        scorer = OnnxScorer(model_bytes, batch_size=batch_size)
+        start = time.perf_counter()
+        scorer.approval_probabilities(features)
+        elapsed = time.perf_counter() - start
+        print(f'  batch {batch_size:6d}  {elapsed:8.3f}s  {len(features) / elapsed:12.0f} pairs/s')
+
+
+if __name__ == '__main__':
+    main()
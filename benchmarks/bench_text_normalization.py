@@ -0,0 +1,58 @@
+"""
+Time and peak memory of normalizing the pair texts with the separate convert_not_a_number_values,
+remove_punctuation and lowercase_text steps against the fused normalize_text.
+
+    python -m benchmarks.bench_text_normalization --rows 100000 1000000
+"""
+import argparse
+import time
+import tracemalloc
+import warnings
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import (
+    convert_not_a_number_values,
+    create_lead_candidate_rows,
+    lowercase_text,
+    normalize_text,
+    preprocess_products,
+    remove_punctuation,
+)
+
+warnings.filterwarnings('ignore')
+
+
+def _measure(func, df) -> tuple:
+    copy = df.copy()
+    start = time.perf_counter()
+    func(copy)
+    elapsed = time.perf_counter() - start
+
+    # Memory is measured on a second run, tracing slows the steps down several times.
+    copy = df.copy()
+    tracemalloc.start()
+    func(copy)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000], help='raw export rows')
+    args = parser.parse_args()
+
+    methods = {
+        'separate': lambda df: lowercase_text(remove_punctuation(convert_not_a_number_values(df))),
+        'fused': normalize_text,
+    }
+    for n_rows in args.rows:
+        pairs = create_lead_candidate_rows(preprocess_products(make_mumford_export(n_rows)))
+        print(f'{n_rows} rows, {len(pairs)} pairs')
+        for name, method in methods.items():
+            elapsed, peak = _measure(method, pairs)
+            print(f'  {name:10s} {elapsed:8.3f}s  peak {peak / 2 ** 20:8.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
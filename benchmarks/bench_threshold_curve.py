@@ -0,0 +1,36 @@
+"""
+Time of building the precision / coverage curve and recommending a threshold on large synthetic test sets.
+
+    python -m benchmarks.bench_threshold_curve --rows 1000000 5000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.cms_auto_approval.pipelines.data_science_mumford_data.evaluation import precision_coverage_curve, recommend_threshold
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 5000000], help='test pairs')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n_rows in args.rows:
+        # Calibrated-looking scores: a pair is APPROVED with its predicted probability.
+        probabilities = rng.beta(2, 1, size=n_rows)
+        is_approved = rng.random(n_rows) < probabilities
+
+        start = time.perf_counter()
+        curve = precision_coverage_curve(probabilities, is_approved)
+        recommended = recommend_threshold(curve)
+        elapsed = time.perf_counter() - start
+        print(
+            f'  {n_rows:9d} pairs  {elapsed:6.2f}s  {len(curve)} thresholds,'
+            f' recommended {recommended["threshold"]:.4f} at coverage {recommended["coverage"]:.3f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
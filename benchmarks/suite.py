@@ -0,0 +1,192 @@
+"""
+Benchmark suite: times every data-engineering step, every feature, training and ONNX scoring on synthetic
+exports, and appends the results to a history csv so that regressions are caught offline.
+
+    python -m benchmarks.suite --rows 10000 100000 1000000
+    python -m benchmarks.suite --rows 10000000 --stages data_engineering features --repeat 1
+    make benchmark
+
+Each step keeps the fastest of --repeat runs, every run on a fresh copy of its input. A step regressed when it
+is more than --tolerance slower than the median of its last HISTORY_WINDOW results on the same host and number
+of rows. --check exits non-zero on a regression, e.g. to run the suite before merging.
+"""
+import argparse
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime, timezone
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import iter_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import (
+    create_lead_candidate_rows, extract_attribute_identifiers, normalize_text, preprocess_pairs, preprocess_products,
+)
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import (
+    FEATURE_COLUMNS, compute_feature_matrix, mpn_match_scores, product_code_in_pair,
+)
+from src.cms_auto_approval.pipelines.data_science_mumford_data.models import BACKENDS, HIST_GRADIENT_BOOSTING, fit_backend
+from src.cms_auto_approval.pipelines.data_science_mumford_data.scoring import OnnxScorer, export_onnx
+from src.cms_auto_approval.pipelines.data_science_mumford_data.similarity import jaccard_scores, tokenize
+
+warnings.filterwarnings('ignore')
+
+STAGES = ['data_engineering', 'features', 'training', 'scoring']
+HISTORY = os.path.join(os.path.dirname(__file__), 'results', 'history.csv')
+HISTORY_COLUMNS = ['timestamp', 'commit', 'host', 'rows', 'step', 'seconds']
+HISTORY_WINDOW = 5
+TOLERANCE = 0.2
+# Differences below this are timer noise, whatever the relative change.
+MIN_SECONDS = 0.02
+# Training is timed on at most this many pairs, the exact-split backend takes minutes beyond it.
+TRAIN_ROWS = 200000
+
+
+def _commit() -> str:
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+        dirty = subprocess.call(['git', 'diff-index', '--quiet', 'HEAD'], stderr=subprocess.DEVNULL) != 0
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Suite:
+
+    def __init__(self, repeat: int = 3):
+        self.repeat = repeat
+        self.results: List[dict] = []
+
+    def time(self, step: str, func: Callable, *inputs, copy: bool = False, repeat: int = None):
+        """
+        Runs func(*inputs) and records its fastest run as step. copy gives every run its own copies of the
+        inputs, for the steps that modify their input in place. Returns the result of the last run.
+        """
+        best = np.inf
+        for _ in range(repeat or self.repeat):
+            args = [value.copy() for value in inputs] if copy else inputs
+            start = time.perf_counter()
+            result = func(*args)
+            best = min(best, time.perf_counter() - start)
+        self.results.append({'step': step, 'seconds': best})
+        print(f'  {step:55s} {best:9.3f}s', flush=True)
+        return result
+
+
+def run_suite(raw: pd.DataFrame, stages: List[str] = STAGES, repeat: int = 3, backends: List[str] = None, train_rows: int = TRAIN_ROWS) -> pd.DataFrame:
+    """
+    Times the steps of the given stages on one raw export. Returns one row per step with its fastest seconds.
+    Later stages use the outputs of the earlier ones, which are computed untimed when their stage is skipped.
+    """
+    suite = Suite(repeat)
+    backends = backends or [HIST_GRADIENT_BOOSTING]
+
+    if 'data_engineering' in stages:
+        suite.time('data_engineering/extract_attribute_identifiers', extract_attribute_identifiers, raw['attrs'])
+        products = suite.time('data_engineering/preprocess_products', preprocess_products, raw, copy=True)
+        rows = suite.time('data_engineering/create_lead_candidate_rows', create_lead_candidate_rows, products)
+        suite.time('data_engineering/normalize_text', normalize_text, rows, copy=True)
+        pairs = suite.time('data_engineering/preprocess_pairs', preprocess_pairs, products, copy=True)
+    else:
+        pairs = preprocess_pairs(preprocess_products(raw.copy()))
+
+    if 'features' in stages:
+        names = suite.time('features/tokenize_names', tokenize, pairs['lead.name'], pairs['other.name'])
+        descriptions = suite.time('features/tokenize_descriptions', tokenize, pairs['lead.description'], pairs['other.description'])
+        suite.time('features/jaccard_sim_score', jaccard_scores, names, *names.codes)
+        suite.time('features/jaccard_sim_score_desc', jaccard_scores, descriptions, *descriptions.codes)
+        suite.time('features/mpn_match', mpn_match_scores, pairs)
+        suite.time('features/is_product_code_in_pair', product_code_in_pair, pairs['lead.name'], pairs['other.name'])
+        features = suite.time('features/compute_feature_matrix', compute_feature_matrix, pairs)
+    else:
+        features = compute_feature_matrix(pairs)
+
+    if 'training' in stages or 'scoring' in stages:
+        n = min(train_rows, len(pairs))
+        x = pd.DataFrame(features[:n], columns=FEATURE_COLUMNS)
+        labels, groups = pairs['decision'].to_numpy()[:n], pairs['matching_engine_candidate_id'].to_numpy()[:n]
+        models = {}
+        for backend in backends:
+            fit = lambda: fit_backend(backend, x, labels, groups)
+            models[backend] = suite.time('training/' + backend, fit, repeat=1) if 'training' in stages else fit()
+
+    if 'scoring' in stages:
+        for backend, model in models.items():
+            model_bytes = suite.time('scoring/' + backend + '/export_onnx', export_onnx, model, repeat=1)
+            scorer = OnnxScorer(model_bytes)
+            suite.time('scoring/' + backend + '/onnx', scorer.approval_probabilities, features)
+
+    return pd.DataFrame(suite.results, columns=['step', 'seconds'])
+
+
+def load_history(path: str = HISTORY) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    return pd.read_csv(path)
+
+
+def append_history(results: pd.DataFrame, path: str = HISTORY) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    results[HISTORY_COLUMNS].to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+
+def compare(results: pd.DataFrame, history: pd.DataFrame, tolerance: float = TOLERANCE, window: int = HISTORY_WINDOW) -> pd.DataFrame:
+    """
+    Adds to each result the median seconds of its last window runs in the history on the same host and rows,
+    the relative change, and whether it is a regression. Steps without history have no baseline.
+    """
+    baseline = (
+        history.groupby(['host', 'rows', 'step'], sort=False)['seconds']
+        .apply(lambda seconds: seconds.tail(window).median()).rename('baseline').reset_index()
+    )
+    compared = results.merge(baseline, on=['host', 'rows', 'step'], how='left')
+    compared['change'] = compared['seconds'] / compared['baseline'] - 1
+    compared['regression'] = (compared['change'] > tolerance) & (compared['seconds'] - compared['baseline'] > MIN_SECONDS)
+    return compared
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000], help='raw export rows, 10k to 10M')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=[HIST_GRADIENT_BOOSTING])
+    parser.add_argument('--train-rows', type=int, default=TRAIN_ROWS, help='pairs to time training on')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--history', default=HISTORY, help='csv the results are appended to')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='relative slowdown flagged as a regression')
+    parser.add_argument('--no-record', action='store_true', help='compare without appending to the history')
+    parser.add_argument('--check', action='store_true', help='exit non-zero on a regression')
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    runs = []
+    for n_rows in args.rows:
+        raw = pd.concat(iter_mumford_export(n_rows, seed=args.seed))
+        print(f'{n_rows:,} rows')
+        results = run_suite(raw, args.stages, args.repeat, args.backends, args.train_rows)
+        del raw
+        runs.append(results.assign(rows=n_rows))
+
+    results = pd.concat(runs, ignore_index=True).assign(
+        timestamp=datetime.now(timezone.utc).isoformat(timespec='seconds'), commit=_commit(), host=platform.node(),
+    )
+    compared = compare(results, history, args.tolerance)
+    print(compared[['rows', 'step', 'seconds', 'baseline', 'change', 'regression']].to_string(index=False, float_format='{:.3f}'.format))
+    if not args.no_record:
+        append_history(results, args.history)
+
+    regressions = compared[compared['regression']]
+    if len(regressions):
+        print(f'{len(regressions)} steps regressed by more than {args.tolerance:.0%}: ' + ', '.join(regressions['step']))
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
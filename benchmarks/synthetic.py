@@ -0,0 +1,139 @@
+"""
+Synthetic data shaped like the Mumford candidate export (pipelines/auto-decisions/*.csv).
+Used by the benchmarks so that they can run offline and at any scale.
+
+Every column is built with array operations, so a million rows take a few seconds. Beyond that,
+iter_mumford_export yields the export in chunks of whole candidate groups and write_mumford_export streams
+them to a csv, e.g. for the 10M row benchmarks.
+"""
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+WORDS = np.array([
+    'black', 'white', 'steel', 'cordless', 'drill', 'driver', 'kit', 'battery', 'charger', 'pro',
+    'compact', 'brushless', 'hammer', 'impact', 'wrench', 'saw', 'blade', 'set', 'case', 'light',
+    'led', 'volt', 'max', 'heavy', 'duty', 'premium', 'series', 'edition', 'pack', 'tool',
+], dtype=object)
+ATTRIBUTE_KEYS = ['MANUFACTURER_PART_NUMBER', 'MODEL_NUMBER', 'BRAND', 'INVALID_MANUFACTURER_PART_NUMBER']
+ATTRIBUTE_RATES = [0.6, 0.5, 0.8, 0.05]
+CLIENTS = np.array(['client_a', 'client_b', 'client_c'], dtype=object)
+NAME_WORDS = 6
+DESCRIPTION_WORDS = 30
+CHUNK_SIZE = 1000000
+
+
+def _codes(rng: np.random.Generator, n: int) -> np.ndarray:
+    letters = np.array(list('ABCDEFGHJKLMNPRSTVWXYZ'), dtype=object)[rng.integers(0, 22, size=(n, 2))]
+    digits = rng.integers(100, 99999, size=n).astype(str).astype(object)
+    return letters[:, 0] + letters[:, 1] + '-' + digits
+
+
+def _join(parts: list, separator: str) -> np.ndarray:
+    # Joins the non-empty strings of each row, parts being one object array per position.
+    joined = parts[0]
+    for part in parts[1:]:
+        both = (joined != '') & (part != '')
+        joined = np.where(both, joined + separator + part, joined + part)
+    return joined
+
+
+def _attrs(codes: np.ndarray, present: np.ndarray, variant: np.ndarray) -> np.ndarray:
+    # A variant carries its part number as a '-V2' model number instead, see make_mumford_export.
+    compact = np.array([code.replace('-', '') for code in codes], dtype=object)
+    values = [codes, compact + ' ' + codes, np.full(len(codes), 'acme', dtype=object), codes]
+    parts = [np.where(present[:, k], key + '=[' + values[k] + ']', '') for k, key in enumerate(ATTRIBUTE_KEYS)]
+    parts[0] = np.where(variant & present[:, 0], 'MODEL_NUMBER=[' + codes + '-V2]', parts[0])
+    return '{' + _join(parts, ', ') + '}'
+
+
+def make_attrs(n_rows: int, seed: int = 0) -> pd.Series:
+    """
+    'JSON-like' attrs strings, e.g. {BRAND=[acme], MANUFACTURER_PART_NUMBER=[AB-1234, AB1234]}.
+    Roughly a fifth of the products have no attributes at all.
+    """
+    rng = np.random.default_rng(seed)
+    present = (rng.random((n_rows, len(ATTRIBUTE_KEYS))) < ATTRIBUTE_RATES) & (rng.random((n_rows, 1)) >= 0.2)
+    return pd.Series(_attrs(_codes(rng, n_rows), present, np.zeros(n_rows, dtype=bool)), name='attrs')
+
+
+def _text(words: np.ndarray) -> np.ndarray:
+    return np.array([' '.join(row) for row in WORDS[words].tolist()], dtype=object)
+
+
+def _mutate(rng: np.random.Generator, words: np.ndarray, rate: float) -> np.ndarray:
+    # Swaps a share of the words, so that matching products have similar but not identical text.
+    swap = rng.random(words.shape) < rate
+    return np.where(swap, rng.integers(0, len(WORDS), size=words.shape), words)
+
+
+def _export_chunk(rng: np.random.Generator, start: int, n_rows: int, group_size: int, id_offset: int) -> pd.DataFrame:
+    rows = np.arange(start, start + n_rows)
+    group_ids = rows // group_size
+    is_lead = rows % group_size == 0
+    is_match = is_lead | (rng.random(n_rows) < 0.5)
+    # The row whose product each row copies: its lead for matches, itself otherwise. A chunk starts at a lead.
+    source = np.arange(n_rows) - np.where(is_match, rows % group_size, 0)
+
+    name_words = rng.integers(0, len(WORDS), size=(n_rows, NAME_WORDS))[source]
+    description_words = rng.integers(0, len(WORDS), size=(n_rows, DESCRIPTION_WORDS))[source]
+    codes = _codes(rng, n_rows)[source]
+    present = (rng.random((n_rows, len(ATTRIBUTE_KEYS))) < ATTRIBUTE_RATES) & (rng.random((n_rows, 1)) >= 0.2)
+    with_code = (rng.random(n_rows) < 0.4)[source]
+
+    candidates = is_match & ~is_lead
+    name_words[candidates] = _mutate(rng, name_words[candidates], 0.3)
+    description_words[candidates] = _mutate(rng, description_words[candidates], 0.2)
+    # Some matches only carry a variant of the lead's part number, which scores as a partial MPN match.
+    variant = candidates & (rng.random(n_rows) < 0.15)
+
+    names = _text(name_words)
+    names = np.where(with_code, names + ' ' + codes, names)
+
+    decision = np.where(is_match, 'APPROVED', 'REJECTED').astype(object)
+    flip = rng.random(n_rows) < 0.05
+    decision[flip] = np.where(is_match[flip], 'REJECTED', 'APPROVED')
+    decision[rng.random(n_rows) < 0.02] = 'ERRORED'
+
+    return pd.DataFrame({
+        'decision': decision,
+        'matching_engine_candidate_id': group_ids,
+        'confidence': np.clip(np.where(is_match, 0.7, 0.4) + rng.normal(0, 0.2, n_rows), 0, 1).round(4),
+        'client_name': CLIENTS[rng.integers(0, len(CLIENTS), size=n_rows)],
+        'name': names,
+        'attrs': _attrs(codes, present[source], variant),
+        'member_type': np.where(is_lead, 'lead', 'candidate'),
+        'external_id': np.where(is_match & (rng.random(n_rows) < 0.3), group_ids, rows + id_offset).astype(str),
+        'description': _text(description_words),
+    }, index=pd.RangeIndex(start, start + n_rows))
+
+
+def make_mumford_export(n_rows: int, seed: int = 0, group_size: int = 5) -> pd.DataFrame:
+    """
+    Raw export rows: one lead per matching engine candidate group followed by its candidates.
+    About half of the candidates are the lead's product, with similar names, descriptions, product codes and attrs,
+    and those are mostly APPROVED. The rest are unrelated products and mostly REJECTED.
+    About 5% of the decisions disagree with that and 2% are ERRORED.
+    """
+    return _export_chunk(np.random.default_rng(seed), 0, n_rows, group_size, id_offset=n_rows)
+
+
+def iter_mumford_export(n_rows: int, seed: int = 0, group_size: int = 5, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    The rows of an n_rows export in chunks of about chunk_size, each holding whole candidate groups and numbered
+    on from the previous one. The chunks depend on seed and chunk_size, not on how many of them are consumed.
+    """
+    chunk_size = max(chunk_size // group_size, 1) * group_size
+    for i, start in enumerate(range(0, n_rows, chunk_size)):
+        rng = np.random.default_rng([seed, i])
+        yield _export_chunk(rng, start, min(chunk_size, n_rows - start), group_size, id_offset=n_rows)
+
+
+def write_mumford_export(path: str, n_rows: int, seed: int = 0, group_size: int = 5, chunk_size: int = CHUNK_SIZE) -> str:
+    """
+    Streams an n_rows export to a csv like the ones in pipelines/auto-decisions, in constant memory.
+    """
+    for i, chunk in enumerate(iter_mumford_export(n_rows, seed, group_size, chunk_size)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
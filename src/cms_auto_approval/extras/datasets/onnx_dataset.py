@@ -7,10 +7,7 @@ from kedro.io.core import (
 )
 import fsspec
 from typing import Any, Dict
-from skl2onnx import convert_sklearn, to_onnx
-from skl2onnx.common.data_types import FloatTensorType
-import onnxruntime as rt
-import onnx
+from cms_auto_approval.pipelines.data_science_mumford_data.scoring import export_onnx
 
 class OnnxDataSet(AbstractVersionedDataSet):
 
@@ -36,14 +33,10 @@ class OnnxDataSet(AbstractVersionedDataSet):
     def _save(self, data) -> None:
         # using get_filepath_str ensures that the protocol and path are appended correctly for different filesystems
         save_path = get_filepath_str(self._get_save_path(), self._protocol)
-        NUM_ROWS_IN_INPUT = 1
-        NUM_FEATURES_IN_INPUT = 14
 
-        with self._fs.open(save_path, "wb") as f:            
-            initial_type = [('float_input', FloatTensorType((NUM_ROWS_IN_INPUT, NUM_FEATURES_IN_INPUT)))]
-            options = {id(data): {'zipmap': False}} # enables getting probabilities in Node.
-            onx = convert_sklearn(data, initial_types=initial_type, options=options)
-            f.write(onx.SerializeToString())
+        with self._fs.open(save_path, "wb") as f:
+            # Dynamic batch dimension, see OnnxScorer for scoring whole batches of pairs per call.
+            f.write(export_onnx(data))
 
     def _describe(self) -> Dict[str, Any]:
         return dict(
@@ -0,0 +1,70 @@
+from pathlib import PurePosixPath
+from kedro.io.core import (
+    AbstractVersionedDataSet,
+    get_filepath_str,
+    get_protocol_and_path,
+    Version
+)
+import fsspec
+import pandas as pd
+from typing import Any, Dict
+from cms_auto_approval.extras.datasets.parquet_partitions import (
+    N_PARTITIONS,
+    PARTITION_ON,
+    read_partitions,
+    write_partitions,
+)
+
+class PartitionedParquetDataSet(AbstractVersionedDataSet):
+    """
+    Partitioned Parquet handoff for the lead / candidate pairs, replacing the CSV between the pipelines.
+    String columns are dictionary encoded, the mpns / model_nos lists are stored as list<string>,
+    and load_args columns projects the load onto the columns a node needs, e.g.
+
+    primary_mumford_candidates_local:
+      type: cms_auto_approval.extras.datasets.parquet_dataset.PartitionedParquetDataSet
+      filepath: data/03_primary/mumford_candidates
+      load_args:
+        columns: [decision, matching_engine_candidate_id, confidence, ...]
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        partition_on: str = PARTITION_ON,
+        n_partitions: int = N_PARTITIONS,
+        load_args: Dict[str, Any] = None,
+        version: Version = None,
+    ):
+        protocol, path = get_protocol_and_path(filepath)
+        self._protocol = protocol
+        self._fs = fsspec.filesystem(self._protocol)
+        self._partition_on = partition_on
+        self._n_partitions = n_partitions
+        self._load_args = load_args or {}
+
+        super().__init__(
+            filepath=PurePosixPath(path),
+            version=version,
+            exists_function=self._fs.exists,
+            glob_function=self._fs.glob,
+        )
+
+    def _load(self) -> pd.DataFrame:
+        load_path = get_filepath_str(self._get_load_path(), self._protocol)
+        return read_partitions(load_path, columns=self._load_args.get('columns'), fs=self._fs)
+
+    def _save(self, data: pd.DataFrame) -> None:
+        # using get_filepath_str ensures that the protocol and path are appended correctly for different filesystems
+        save_path = get_filepath_str(self._get_save_path(), self._protocol)
+        write_partitions(data, save_path, partition_on=self._partition_on, n_partitions=self._n_partitions, fs=self._fs)
+
+    def _describe(self) -> Dict[str, Any]:
+        return dict(
+            filepath=self._filepath,
+            partition_on=self._partition_on,
+            n_partitions=self._n_partitions,
+            load_args=self._load_args,
+            version=self._version,
+            protocol=self._protocol,
+        )
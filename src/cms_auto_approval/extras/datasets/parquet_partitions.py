@@ -0,0 +1,84 @@
+"""
+Reading and writing the partitioned Parquet layout used between the data engineering and data science pipelines:
+a directory of part-NNNNN.parquet files, hash partitioned on the matching engine candidate id so that every
+candidate group is whole within one file. Kept free of Kedro so the Flyte tasks can use it too.
+"""
+from typing import List
+
+import fsspec
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PARTITION_ON = 'matching_engine_candidate_id'
+N_PARTITIONS = 16
+
+
+def partition_path(path: str, k: int) -> str:
+    return f'{path}/part-{k:05d}.parquet'
+
+
+def to_arrow_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Converts the pairs to Arrow with typed list columns: list<string> even when a partition only holds empty lists.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_list(field.type) and not pa.types.is_string(field.type.value_type):
+            list_type = pa.list_(pa.string())
+            table = table.set_column(i, pa.field(field.name, list_type), table.column(i).cast(list_type))
+    return table
+
+
+def write_parquet(df: pd.DataFrame, path: str, fs: fsspec.AbstractFileSystem = None, row_group_size: int = None) -> None:
+    """
+    Writes one file, dictionary encoding the string columns (the text repeats across every pair of a product).
+    """
+    fs = fs or fsspec.filesystem('file')
+    table = to_arrow_table(df)
+    string_columns = [field.name for field in table.schema if pa.types.is_string(field.type)]
+    with fs.open(path, 'wb') as f:
+        pq.write_table(table, f, row_group_size=row_group_size, use_dictionary=string_columns, compression='snappy')
+
+
+def write_partitions(
+    df: pd.DataFrame,
+    path: str,
+    partition_on: str = PARTITION_ON,
+    n_partitions: int = N_PARTITIONS,
+    fs: fsspec.AbstractFileSystem = None,
+) -> List[str]:
+    """
+    Writes df to path hash partitioned on partition_on, replacing the part files of any earlier write:
+    read_partitions reads every part file, so stale ones would mix into the data.
+    """
+    fs = fs or fsspec.filesystem('file')
+    fs.makedirs(path, exist_ok=True)
+    for stale in list_partitions(path, fs=fs):
+        fs.rm(stale)
+    partitions = pd.util.hash_pandas_object(df[partition_on], index=False) % n_partitions
+
+    paths = []
+    for k, partition in df.groupby(partitions):
+        paths.append(partition_path(path, k))
+        write_parquet(partition, paths[-1], fs=fs)
+    return paths
+
+
+def list_partitions(path: str, fs: fsspec.AbstractFileSystem = None) -> List[str]:
+    fs = fs or fsspec.filesystem('file')
+    return sorted(fs.glob(f'{path}/part-*.parquet'))
+
+
+def read_partitions(
+    path: str, columns: List[str] = None, fs: fsspec.AbstractFileSystem = None
+) -> pd.DataFrame:
+    """
+    Reads every partition of the dataset at path. columns projects the read onto just those columns.
+    """
+    fs = fs or fsspec.filesystem('file')
+    frames = []
+    for partition in list_partitions(path, fs=fs):
+        with fs.open(partition, 'rb') as f:
+            frames.append(pq.read_table(f, columns=columns).to_pandas())
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
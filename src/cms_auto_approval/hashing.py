@@ -0,0 +1,74 @@
+"""
+Short, stable digests of data frames, for the Flyte task cache (src/types.py) and the feature cache.
+
+Columns are hashed one at a time with pd.util.hash_pandas_object and folded into a single blake2b digest,
+so hashing never copies the frame or builds a string of the per-row hashes.
+"""
+import hashlib
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+FULL = 'full'
+SAMPLED = 'sampled'
+METADATA = 'metadata'
+SAMPLE_ROWS = 10000
+
+# Prefix of list cells once joined into strings, so that ['a'] and 'a' hash differently.
+LIST_MARKER = '\x1e'
+LIST_SEPARATOR = '\x1f'
+
+
+def _join_lists(values: pd.Series) -> pd.Series:
+    return values.map(
+        lambda v: LIST_MARKER + LIST_SEPARATOR.join(map(str, v)) if isinstance(v, (list, tuple, np.ndarray)) else v
+    )
+
+def hash_series(values: pd.Series) -> np.ndarray:
+    """
+    Per-row uint64 hashes of a column. Typed columns are hashed directly, object columns holding lists
+    (such as mpns / model_nos) have their list cells joined into strings first.
+    """
+    if values.dtype == object:
+        try:
+            return pd.util.hash_pandas_object(values, index=False).to_numpy()
+        except TypeError:
+            values = _join_lists(values)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def _sample_positions(n_rows: int, sample_rows: int) -> np.ndarray:
+    # Evenly spaced rows, always including the first and last.
+    return np.unique(np.linspace(0, n_rows - 1, num=min(n_rows, sample_rows)).astype(np.int64))
+
+def hash_dataframe(
+    df: pd.DataFrame,
+    columns: List[str] = None,
+    index: bool = True,
+    mode: str = FULL,
+    sample_rows: int = SAMPLE_ROWS,
+) -> str:
+    """
+    Hex digest of df, or of just the given columns. The shape, column names and dtypes are always part of it.
+    mode picks how much of the data is read:
+    'full' hashes every row, 'sampled' only sample_rows evenly spaced rows,
+    and 'metadata' none, so frames of the same schema and length hash the same.
+    """
+    if mode not in (FULL, SAMPLED, METADATA):
+        raise ValueError(f"Unknown hash mode '{mode}', expected one of {FULL}, {SAMPLED}, {METADATA}")
+
+    columns = list(df.columns) if columns is None else columns
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((mode, len(df), [(str(c), str(df[c].dtype)) for c in columns])).encode())
+    if mode == METADATA:
+        return digest.hexdigest()
+
+    positions = _sample_positions(len(df), sample_rows) if mode == SAMPLED and len(df) > sample_rows else None
+    if index:
+        labels = df.index if positions is None else df.index[positions]
+        digest.update(pd.util.hash_pandas_object(labels).to_numpy().tobytes())
+    for column in columns:
+        values = df[column] if positions is None else df[column].iloc[positions]
+        digest.update(hash_series(values).tobytes())
+    return digest.hexdigest()
@@ -1,5 +1,6 @@
 
 """Project hooks."""
+import logging
 from typing import Any, Dict, Iterable, Optional
 from kedro.config import ConfigLoader
 from kedro.framework.hooks import hook_impl
@@ -9,6 +10,9 @@ from kedro.versioning import Journal
 from cms_auto_approval.pipelines.data_engineering_mumford_data import pipeline as de_m
 from cms_auto_approval.pipelines.data_science_mumford_data import pipeline as ds_m
 from kedro.config import TemplatedConfigLoader 
+from cms_auto_approval.profiling import RunProfiler
+
+log = logging.getLogger(__name__)
 
 
 class ProjectHooks:
@@ -43,4 +47,35 @@ class ProjectHooks:
     ) -> DataCatalog:
         return DataCatalog.from_config(
             catalog, credentials, load_versions, save_version, journal
-        )
\ No newline at end of file
+        )
+
+class ProfilingHooks(RunProfiler):
+    """
+    Records every node run as a profiling step (wall / CPU time, peak RSS, rows in and out), with the sub-steps
+    decorated with @profiled nested under it, and logs a summary table when the pipeline finishes.
+    Set CMS_AUTO_APPROVAL_PROFILE_DIR to also write a cProfile file per node. See profiling.RunProfiler.
+    """
+
+    @hook_impl
+    def before_pipeline_run(self) -> None:
+        super().before_pipeline_run()
+
+    @hook_impl
+    def before_node_run(self, node, inputs: Dict[str, Any]) -> None:
+        super().before_node_run(node, inputs)
+
+    @hook_impl
+    def after_node_run(self, node, outputs: Dict[str, Any]) -> None:
+        super().after_node_run(node, outputs)
+
+    @hook_impl
+    def on_node_error(self, error: Exception, node) -> None:
+        super().on_node_error(error, node)
+
+    @hook_impl
+    def after_pipeline_run(self) -> None:
+        super().after_pipeline_run()
+
+    @hook_impl
+    def on_pipeline_error(self, error: Exception) -> None:
+        super().on_pipeline_error(error)
@@ -0,0 +1,145 @@
+"""
+Incremental training: each day's newly arrived candidate decisions are pre-processed and featurized once and kept
+in a history partitioned by date, so a retrain only processes the new delta and appends it to the training matrix.
+
+A history is a directory (local or any fsspec URL, e.g. s3://...) of date=YYYY-MM-DD partitions, each holding
+
+    pairs.parquet   the pre-processed lead / candidate pairs
+    features.npy    their float32 feature matrix, in FEATURE_COLUMNS order
+    labels.npy      the decision labels
+    groups.npy      the matching engine candidate ids
+    FEATURE_CODE    hash of the feature code that built features.npy, written last to mark the partition complete
+
+Partitions featurized by an older version of the feature code are re-featurized from pairs.parquet when loaded.
+Candidate groups must be whole within a delta, as the group features are computed per partition.
+"""
+import io
+import logging
+from typing import Dict, List, Tuple
+
+import fsspec
+import numpy as np
+import pandas as pd
+
+from .extras.datasets.parquet_partitions import write_parquet
+from .pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from .pipelines.data_science_mumford_data.feature_cache import feature_code_hash
+from .pipelines.data_science_mumford_data.features import compute_feature_matrix_parallel
+from .pipelines.data_science_mumford_data.nodes import fit_model, model_options
+
+log = logging.getLogger(__name__)
+
+ARRAYS = ['features', 'labels', 'groups']
+MARKER = 'FEATURE_CODE'
+
+
+def _partition(history: str, date: str) -> str:
+    return history.rstrip('/') + '/date=' + date
+
+
+def _save_array(fs: fsspec.AbstractFileSystem, path: str, array: np.ndarray) -> None:
+    # Strings as fixed width unicode, so loading never needs pickle.
+    if array.dtype == object:
+        array = array.astype(str)
+    with fs.open(path, 'wb') as f:
+        np.save(f, array)
+
+
+def _load_array(fs: fsspec.AbstractFileSystem, path: str) -> np.ndarray:
+    if 'file' in fs.protocol:
+        return np.load(fs._strip_protocol(path), mmap_mode='r')
+    with fs.open(path, 'rb') as f:
+        return np.load(io.BytesIO(f.read()))
+
+
+def _unmark(fs: fsspec.AbstractFileSystem, partition: str) -> None:
+    if fs.exists(partition + '/' + MARKER):
+        fs.rm(partition + '/' + MARKER)
+
+
+def _read_pairs(fs: fsspec.AbstractFileSystem, partition: str) -> pd.DataFrame:
+    with fs.open(partition + '/pairs.parquet', 'rb') as f:
+        return pd.read_parquet(f)
+
+
+def _featurize(fs: fsspec.AbstractFileSystem, partition: str, pairs: pd.DataFrame, n_jobs: int) -> None:
+    _unmark(fs, partition)
+    arrays = [
+        compute_feature_matrix_parallel(pairs, n_jobs=n_jobs),
+        pairs['decision'].to_numpy(),
+        pairs['matching_engine_candidate_id'].to_numpy(),
+    ]
+    for name, array in zip(ARRAYS, arrays):
+        _save_array(fs, partition + '/' + name + '.npy', array)
+    fs.pipe(partition + '/' + MARKER, feature_code_hash().encode())
+
+
+def add_delta(df: pd.DataFrame, date: str, history: str, n_jobs: int = 1) -> str:
+    """
+    Pre-processes and featurizes one delta of the raw export and stores it as the history partition of date.
+    Adding a date again replaces its partition. Returns the partition path.
+    """
+    fs, _ = fsspec.core.url_to_fs(history)
+    partition = _partition(history, date)
+    fs.makedirs(partition, exist_ok=True)
+
+    pairs = preprocess_mumford_data(df).reset_index(drop=True)
+    # Unmark the partition first, so an interrupted write is never loaded.
+    _unmark(fs, partition)
+    write_parquet(pairs, partition + '/pairs.parquet', fs=fs)
+    _featurize(fs, partition, pairs, n_jobs)
+    log.info('Incremental - Added ' + str(len(pairs)) + ' pairs for ' + date)
+
+    return partition
+
+
+def list_dates(history: str) -> List[str]:
+    fs, path = fsspec.core.url_to_fs(history)
+    if not fs.exists(path):
+        return []
+    return sorted(p.rstrip('/').rsplit('date=', 1)[1] for p in fs.glob(path.rstrip('/') + '/date=*'))
+
+
+def load_history(history: str, since: str = None, n_jobs: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The features, labels and groups of every complete partition (from the since date on, if given), in date order.
+    """
+    fs, _ = fsspec.core.url_to_fs(history)
+    code = feature_code_hash()
+
+    parts: Dict[str, list] = {name: [] for name in ARRAYS}
+    for date in list_dates(history):
+        if since and date < since:
+            continue
+        partition = _partition(history, date)
+        if not fs.exists(partition + '/' + MARKER):
+            if not fs.exists(partition + '/pairs.parquet'):
+                log.info('Incremental - Skipping incomplete partition ' + partition)
+                continue
+            log.info('Incremental - Featurizing interrupted partition ' + partition)
+            _featurize(fs, partition, _read_pairs(fs, partition), n_jobs)
+        elif fs.cat(partition + '/' + MARKER).decode() != code:
+            log.info('Incremental - Re-featurizing ' + partition + ' with the current feature code')
+            _featurize(fs, partition, _read_pairs(fs, partition), n_jobs)
+
+        for name in ARRAYS:
+            parts[name].append(_load_array(fs, partition + '/' + name + '.npy'))
+
+    if not parts['features']:
+        raise ValueError('No featurized partitions in ' + history)
+    return tuple(np.concatenate(parts[name]) for name in ARRAYS)
+
+
+def train_model_incremental(df: pd.DataFrame, date: str, history: str, parameters: Dict = None):
+    """
+    Adds df, the decisions that arrived on date, to the history and trains on the whole history.
+    Reads 'history_since' (the first date to train on, default all) from the parameters, as well as the
+    'feature_n_jobs', 'model_backend' and 'model_n_threads' of train_model.
+    """
+    parameters = parameters or {}
+    n_jobs = parameters.get('feature_n_jobs', 1)
+    add_delta(df, date, history, n_jobs=n_jobs)
+    features, labels, groups = load_history(history, since=parameters.get('history_since'), n_jobs=n_jobs)
+    log.info('Incremental - Training on ' + str(len(features)) + ' pairs')
+
+    return fit_model(features, labels, groups, **model_options(parameters))
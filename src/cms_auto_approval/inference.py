@@ -0,0 +1,68 @@
+"""
+Online scoring: raw matching engine candidate groups in, APPROVED / DEFERRED decisions per candidate out.
+
+Runs the same transforms as training, the data engineering steps of preprocess_mumford_data followed by the
+batched feature engine, so production scoring does not reimplement them. It skips what only training needs:
+label handling, per-step logging and the process pool.
+"""
+import numpy as np
+import pandas as pd
+
+from .pipelines.data_engineering_mumford_data.nodes import (
+    create_lead_candidate_rows,
+    extract_attribute_identifiers,
+    normalize_text,
+)
+from .pipelines.data_science_mumford_data.features import compute_feature_matrix
+from .pipelines.data_science_mumford_data.scoring import CONFIDENCE_THRESHOLD, OnnxScorer, decide
+
+# Columns of the raw export that scoring needs, 'decision' is optional.
+RAW_COLUMNS = [
+    'matching_engine_candidate_id', 'confidence', 'client_name', 'name', 'attrs', 'member_type', 'external_id',
+    'description',
+]
+DECISION_COLUMNS = ['matching_engine_candidate_id', 'other.external_id', 'approval_probability', 'decision']
+
+
+def prepare_pairs(groups: pd.DataFrame) -> pd.DataFrame:
+    """
+    The data engineering steps of training on raw export rows, without the label handling.
+    Each group needs its lead row; candidates of groups without one are dropped, as in training.
+    """
+    products = groups[RAW_COLUMNS].copy()
+    # create_lead_candidate_rows carries the moderator decision through, there is none yet.
+    products['decision'] = np.nan
+    identifiers = extract_attribute_identifiers(products['attrs'])
+    products['mpns'] = identifiers['mpns']
+    products['model_nos'] = identifiers['model_nos']
+
+    return normalize_text(create_lead_candidate_rows(products))
+
+
+class OnlineScorer:
+    """
+    Scores raw candidate groups with an exported model (a path or bytes, see export_onnx).
+    Create one per process and reuse it, it holds the ONNX runtime session.
+    """
+
+    def __init__(self, model, threshold: float = CONFIDENCE_THRESHOLD, n_threads: int = 1):
+        # A single thread per session keeps small requests from paying for thread pool hand offs.
+        self._scorer = OnnxScorer(model, threshold=threshold, n_threads=n_threads)
+
+    def score_pairs(self, pairs: pd.DataFrame) -> pd.DataFrame:
+        probabilities = self._scorer.approval_probabilities(compute_feature_matrix(pairs))
+        decisions = pairs[['matching_engine_candidate_id', 'other.external_id']].reset_index(drop=True)
+        decisions['approval_probability'] = probabilities
+        decisions['decision'] = decide(probabilities, self._scorer.threshold)
+        return decisions
+
+    def score(self, groups: pd.DataFrame) -> pd.DataFrame:
+        """
+        Decides every candidate of the given groups, rows in the shape of the training export.
+        Returns one row per candidate with its group id, external id, APPROVED probability and decision.
+        Group features are computed over the rows passed in, so pass complete groups.
+        """
+        pairs = prepare_pairs(groups)
+        if not len(pairs):
+            return pd.DataFrame(columns=DECISION_COLUMNS)
+        return self.score_pairs(pairs)
@@ -0,0 +1,161 @@
+"""
+asyncio front end to OnlineScorer that combines concurrent requests into micro-batches.
+
+Requests queue up until max_batch_size candidate rows are waiting or the oldest has waited max_wait seconds,
+then the whole batch is scored with one call in a thread pool and each caller gets back its own decisions.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import pandas as pd
+
+from .inference import RAW_COLUMNS, OnlineScorer
+
+log = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 2048
+MAX_WAIT = 0.005
+GROUP_COLUMN = 'matching_engine_candidate_id'
+
+
+def _score_batch(scorer: OnlineScorer, requests: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    # Group ids are only unique within a request, so every request's groups are renumbered into their own range
+    # before concatenating, and the original ids restored when the decisions are split back up.
+    # A request with missing group ids is scored on its own: its rows without an id pair up with each other and
+    # get no group features, which no renumbering can keep apart from the other requests' missing ids.
+    results = [scorer.score(groups) if groups[GROUP_COLUMN].isna().any() else None for groups in requests]
+    batched = [i for i, result in enumerate(results) if result is None]
+    if not batched:
+        return results
+
+    frames, uniques, offsets = [], [], [0]
+    for i in batched:
+        codes, ids = pd.factorize(requests[i][GROUP_COLUMN])
+        frames.append(requests[i].assign(**{GROUP_COLUMN: codes + offsets[-1]}))
+        uniques.append(ids)
+        offsets.append(offsets[-1] + len(ids))
+
+    decisions = scorer.score(pd.concat(frames, ignore_index=True))
+    for k, (i, ids) in enumerate(zip(batched, uniques)):
+        in_request = (decisions[GROUP_COLUMN] >= offsets[k]) & (decisions[GROUP_COLUMN] < offsets[k + 1])
+        result = decisions[in_request].reset_index(drop=True)
+        result[GROUP_COLUMN] = ids[result[GROUP_COLUMN].to_numpy() - offsets[k]]
+        results[i] = result
+    return results
+
+
+class MicroBatchScorer:
+    """
+    Scores candidate groups for many concurrent callers, e.g.
+
+        batcher = MicroBatchScorer(OnlineScorer(model_path))
+        decisions = await batcher.score(groups)
+
+    max_batch_size counts raw rows, a request is never split across batches. Scoring runs on a pool of
+    n_workers threads, so a batch can be collected while the previous one is scored.
+    """
+
+    def __init__(
+        self,
+        scorer: OnlineScorer,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait: float = MAX_WAIT,
+        n_workers: int = 1,
+    ):
+        self._scorer = scorer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._executor = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix='micro-batch')
+        self._queue = None
+        self._collector = None
+        self._pending = set()
+
+    async def score(self, groups: pd.DataFrame) -> pd.DataFrame:
+        """
+        Decisions for the candidates of groups, as OnlineScorer.score returns them.
+        """
+        # Checked before batching, concatenating would fill a missing column with NaN for this request only.
+        missing = [column for column in RAW_COLUMNS if column not in groups.columns]
+        if missing:
+            raise KeyError(f'Candidate groups are missing the columns {missing}')
+        if self._collector is None:
+            self._queue = asyncio.Queue()
+            self._collector = asyncio.get_running_loop().create_task(self._collect())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((groups, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        carried, batch = None, []
+        try:
+            while True:
+                batch = [carried or await self._queue.get()]
+                carried = None
+                size = len(batch[0][0])
+                deadline = loop.time() + self.max_wait
+                while size < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        request = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if size + len(request[0]) > self.max_batch_size:
+                        # Starts the next batch instead, so batches stay within max_batch_size where requests allow.
+                        carried = request
+                        break
+                    batch.append(request)
+                    size += len(request[0])
+
+                task = loop.create_task(self._run(batch))
+                self._pending.add(task)
+                task.add_done_callback(self._pending.discard)
+                batch = []
+        except asyncio.CancelledError:
+            # Closed while collecting: the requests already taken off the queue are cancelled like the queued ones.
+            for _, future in batch + ([carried] if carried else []):
+                future.cancel()
+            raise
+
+    async def _run(self, batch: List[Tuple[pd.DataFrame, asyncio.Future]]):
+        requests, futures = zip(*batch)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _score_batch, self._scorer, list(requests)
+            )
+        except Exception as e:
+            if len(batch) > 1:
+                # One bad request must not fail the others, so they are retried one at a time.
+                log.warning('Micro-batch of ' + str(len(requests)) + ' requests failed, scoring them one at a time')
+                for request in batch:
+                    await self._run([request])
+                return
+            log.exception('Request of ' + str(len(requests[0])) + ' rows failed')
+            if not futures[0].done():
+                futures[0].set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self):
+        """
+        Stops collecting, waits for the batches already being scored and shuts down the thread pool.
+        Requests that were not being scored yet are cancelled, their score calls raise CancelledError.
+        """
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+            while not self._queue.empty():
+                self._queue.get_nowait()[1].cancel()
+        if self._pending:
+            await asyncio.gather(*self._pending)
+        self._executor.shutdown()
@@ -2,6 +2,15 @@ import pandas as pd
 import logging
 log = logging.getLogger(__name__)
 import numpy as np
+import re
+
+from ...profiling import profiled
+
+# Output column -> key in the 'JSON-like' attrs string.
+ATTRIBUTE_KEYS = {
+    'mpns': 'MANUFACTURER_PART_NUMBER',
+    'model_nos': 'MODEL_NUMBER',
+}
 
 def remove_punctuation(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -70,6 +79,72 @@ def get_clean_model_nos(row: pd.DataFrame) -> list:
         return '[]'
 
 
+ATTRIBUTE_NOISE = re.compile(r'[{},]')
+INVALID_MPN_KEY = 'INVALID_MANUFACTURER_PART_NUMBER'
+
+def _parse_attributes(attributes: str, keys: tuple) -> tuple:
+    # Same chunking as get_clean_mpns / get_clean_model_nos, but one split serves every key.
+    if not isinstance(attributes, str):
+        return ('[]',) * len(keys)
+    attributes = ATTRIBUTE_NOISE.sub('', attributes)
+    pairs = attributes.split(']')
+    # Only get_clean_mpns renames the invalid MPN key, the other keys are parsed from the attributes as they are.
+    renamed = attributes.replace(INVALID_MPN_KEY, "INVALID_MPN").split(']') if INVALID_MPN_KEY in attributes else pairs
+
+    values = []
+    for key in keys:
+        value = '[]'
+        for pair in renamed if key == ATTRIBUTE_KEYS['mpns'] else pairs:
+            if key in pair:
+                if '[' in pair:
+                    value = '[' + pair.split('[', 1)[1].replace(" ", ", ") + ']'
+                break
+        values.append(value)
+    return tuple(values)
+
+def extract_attribute_lists(attrs: pd.Series, keys: dict = ATTRIBUTE_KEYS) -> pd.DataFrame:
+    """
+    Column-wise replacement for get_clean_mpns / get_clean_model_nos, giving the same '[a, b]' strings.
+    Each distinct attrs string is parsed once for all of the requested keys and the results are broadcast back to the rows.
+    Missing keys and unparseable attributes give '[]'.
+    """
+    codes, uniques = pd.factorize(attrs)
+    parsed = [_parse_attributes(attributes, tuple(keys.values())) for attributes in uniques]
+
+    # Missing attrs are factorized to -1, which picks up the trailing '[]' row.
+    values = np.full((len(parsed) + 1, len(keys)), '[]', dtype=object)
+    if parsed:
+        values[:-1] = np.array(parsed, dtype=object)
+
+    return pd.DataFrame(values[codes], columns=list(keys), index=attrs.index)
+
+IDENTIFIER_NOISE = re.compile(r'[\W_]+')
+
+def clean_identifiers(values: str) -> list:
+    """
+    Turns an extracted '[a, b]' string into the normalized identifiers the data-science features match on,
+    lowercased with non-word characters removed. No values gives an empty list.
+    """
+    if values == '[]':
+        return []
+    return [IDENTIFIER_NOISE.sub('', value.lower()) for value in values.split(',')]
+
+def extract_attribute_identifiers(attrs: pd.Series, keys: dict = ATTRIBUTE_KEYS) -> pd.DataFrame:
+    """
+    Like extract_attribute_lists, but every column holds lists of normalized identifiers.
+    Rows with the same attrs share a single list object, so the columns cost memory per distinct product rather than per row.
+    """
+    codes, uniques = pd.factorize(attrs)
+    parsed = [_parse_attributes(attributes, tuple(keys.values())) for attributes in uniques]
+
+    values = np.empty((len(parsed) + 1, len(keys)), dtype=object)
+    for i, row in enumerate(parsed + [('[]',) * len(keys)]):
+        for k, value in enumerate(row):
+            values[i, k] = clean_identifiers(value)
+
+    return pd.DataFrame(values[codes], columns=list(keys), index=attrs.index)
+
+
 def convert_not_a_number_values(df: pd.DataFrame) -> pd.DataFrame:
 
     df['lead.name'] = df['lead.name'].replace(np.nan, '', regex=True)
@@ -79,52 +154,130 @@ def convert_not_a_number_values(df: pd.DataFrame) -> pd.DataFrame:
 
     return df
 
-def create_lead_candidate_rows(df: pd.DataFrame) -> pd.DataFrame:
-
-    df_c = df[df['member_type'] != 'lead']
-    df_l = df[df['member_type'] == 'lead']
-
-    # Rename child dataframes to reflect their role as a lead or candidate product.
-    df_l = df_l[['client_name', 'matching_engine_candidate_id', 'name', 'attrs', 'member_type', 'external_id', 'mpns', 'model_nos', 'description']]
-    df_l = df_l.rename(columns={'client_name': 'lead.client_name', 'name': 'lead.name', 'attrs': 'lead.attrs', 'member_type': 'lead.member_type', 'external_id': 'lead.external_id', 'mpns': 'lead.mpns', 'model_nos': 'lead.model_nos', 'description': 'lead.description',})
-    df_c = df_c[['decision', 'matching_engine_candidate_id', 'confidence', 'client_name', 'name', 'attrs', 'member_type', 'external_id', 'mpns', 'model_nos', 'description']]
-    df_c = df_c.rename(columns={'client_name': 'other.client_name', 'name': 'other.name', 'attrs': 'other.attrs', 'member_type': 'other.member_type', 'external_id': 'other.external_id', 'mpns': 'other.mpns', 'model_nos': 'other.model_nos', 'description': 'other.description',})
-    df = pd.merge(df_c, df_l, on='matching_engine_candidate_id', how='inner')
+PUNCTUATION = re.compile(r'[^\w\s]+')
+# Text columns of the pairs -> whether remove_punctuation applies to them.
+TEXT_COLUMNS = {
+    'lead.name': True,
+    'other.name': True,
+    'lead.description': False,
+    'other.description': False,
+}
+
+def _normalize(texts: np.ndarray, strip_punctuation: bool) -> list:
+    # Missing text becomes '', other values that are not strings come out of the .str methods as NaN.
+    if strip_punctuation:
+        return [PUNCTUATION.sub('', text).lower() if isinstance(text, str) else np.nan for text in texts]
+    return [text.lower() if isinstance(text, str) else '' if pd.isna(text) else np.nan for text in texts]
+
+def normalize_text(df: pd.DataFrame, columns: dict = TEXT_COLUMNS) -> pd.DataFrame:
+    """
+    convert_not_a_number_values, remove_punctuation and lowercase_text fused into one pass per text column, with the
+    same result. Each column is replaced once, instead of once per step.
+    """
+    for column, strip_punctuation in columns.items():
+        if strip_punctuation:
+            # The regex is the expensive part, so it runs once per distinct text. Missing text is factorized to -1,
+            # which picks up the trailing ''.
+            codes, uniques = pd.factorize(df[column])
+            df[column] = np.array(_normalize(uniques, True) + [''], dtype=object)[codes]
+        else:
+            df[column] = np.array(_normalize(df[column].to_numpy(), False), dtype=object)
 
-    # Remove rows when products are lead to lead, redundant processing.
-    df = df[~((df['other.member_type'] == 'lead') & (df['lead.member_type'] == 'lead'))] 
-    
     return df
 
-def preprocess_mumford_data(df: pd.DataFrame) -> pd.DataFrame:
+# Columns of the export carried into the pairs, from the lead and the candidate row, and their names in the pairs.
+LEAD_COLUMNS = {
+    'client_name': 'lead.client_name', 'name': 'lead.name', 'attrs': 'lead.attrs', 'member_type': 'lead.member_type',
+    'external_id': 'lead.external_id', 'mpns': 'lead.mpns', 'model_nos': 'lead.model_nos', 'description': 'lead.description',
+}
+CANDIDATE_COLUMNS = {
+    'decision': 'decision', 'matching_engine_candidate_id': 'matching_engine_candidate_id', 'confidence': 'confidence',
+    'client_name': 'other.client_name', 'name': 'other.name', 'attrs': 'other.attrs', 'member_type': 'other.member_type',
+    'external_id': 'other.external_id', 'mpns': 'other.mpns', 'model_nos': 'other.model_nos', 'description': 'other.description',
+}
+
+def lead_candidate_positions(group_ids: pd.Series, is_lead: np.ndarray) -> tuple:
+    """
+    The row positions of every (candidate, lead) pair of the same group, in the order pd.merge of the candidates
+    and the leads on the group id gives them: groups in order of their first candidate, then candidates, then leads.
+    One factorization and a stable sort of the group codes, instead of hashing both sides into a join.
+    """
+    leads, candidates = np.flatnonzero(is_lead), np.flatnonzero(~is_lead)
+    # Factorizing the candidates first numbers the groups in order of their first candidate. Missing group ids
+    # pair with each other, as they do in pd.merge.
+    order = np.concatenate([candidates, leads])
+    groups = np.empty(len(order), dtype=np.int64)
+    groups[order], _ = pd.factorize(group_ids.to_numpy()[order], use_na_sentinel=False)
+    n_groups = groups.max() + 1 if len(groups) else 0
+
+    # The leads of group g are leads_by_group[first_lead[g]:first_lead[g] + leads_per_group[g]].
+    leads_by_group = leads[np.argsort(groups[leads], kind='stable')]
+    leads_per_group = np.bincount(groups[leads], minlength=n_groups)
+    first_lead = np.cumsum(leads_per_group) - leads_per_group
+
+    candidates = candidates[np.argsort(groups[candidates], kind='stable')]
+    pairs_per_candidate = leads_per_group[groups[candidates]]
+    candidate_rows = np.repeat(candidates, pairs_per_candidate)
+    nth_lead = np.arange(len(candidate_rows)) - np.repeat(np.cumsum(pairs_per_candidate) - pairs_per_candidate, pairs_per_candidate)
+    lead_rows = leads_by_group[np.repeat(first_lead[groups[candidates]], pairs_per_candidate) + nth_lead]
+    return candidate_rows, lead_rows
 
-    ROW_LIMIT = len(df)
-    df = df.head(ROW_LIMIT)
+def create_lead_candidate_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pairs every candidate row with the lead row of its matching engine candidate group, renaming their columns to
+    the 'other.' and 'lead.' columns. Candidates of groups without a lead are dropped. The pairs are gathered by
+    position from the group index of lead_candidate_positions rather than merged, so only the output is materialized.
+    """
+    candidate_rows, lead_rows = lead_candidate_positions(df['matching_engine_candidate_id'], (df['member_type'] == 'lead').to_numpy())
+    # Leads are never paired with each other, as the candidates are the rows that are not leads.
+    pairs = {name: df[column].to_numpy()[candidate_rows] for column, name in CANDIDATE_COLUMNS.items()}
+    pairs.update({name: df[column].to_numpy()[lead_rows] for column, name in LEAD_COLUMNS.items()})
+
+    # Keeps one array per column instead of consolidating them into a copy.
+    return pd.DataFrame(pairs, copy=False)
 
-    df = df[df['decision'] != 'ERRORED']
+@profiled()
+def preprocess_products(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The steps that only look at one product row at a time, so they can run on any slice of the export.
+    """
+    # The filter already copies the rows. The shallow copy only drops pandas' tracking of df as a slice, so that
+    # adding columns to it does not go through the chained-assignment check.
+    df = df[df['decision'] != 'ERRORED'].copy(deep=False)
     log.info("Data Engineering - Kept Only APPROVED And REJECTED Decisions")
 
-    df['mpns'] = df.apply(get_clean_mpns, axis=1)
-    log.info("Data Engineering - Unnest the attributes object, retrieving the MPN information.")
+    attribute_lists = extract_attribute_identifiers(df['attrs'])
+    df['mpns'] = attribute_lists['mpns']
+    df['model_nos'] = attribute_lists['model_nos']
+    log.info("Data Engineering - Unnest the attributes object, retrieving the normalized MPN and Model Number lists.")
 
-    df['model_nos'] = df.apply(get_clean_model_nos, axis=1)
-    log.info("Data Engineering - Unnest the attributes object, retrieving the Model Number information.")
+    return df
 
+@profiled()
+def preprocess_pairs(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The steps that pair leads with their candidates. Every matching engine candidate group must be complete in df.
+    """
     df = create_lead_candidate_rows(df)
     log.info("Data Engineering - Created lead -= candidate row wise relationship.")
 
-    df = convert_not_a_number_values(df)
-    log.info("Data Engineering - Replaced NANs for products with empty String")
-
-    df = remove_punctuation(df)
-    log.info("Data Engineering - Removed punctuation from text")
-
-    df = lowercase_text(df)
-    log.info("Data Engineering - Converted all text to lowercase")
+    df = normalize_text(df)
+    log.info("Data Engineering - Replaced NANs with empty String, removed punctuation from names and lowercased the text")
 
     df['decision'] = df['decision'].map({'APPROVED':'APPROVED', 'REJECTED':'DEFERRED'})
     log.info("Data Engineering - Modified target label from REJECTED to DEFERRED")
 
+    return df
+
+@profiled()
+def preprocess_mumford_data(df: pd.DataFrame) -> pd.DataFrame:
+
+    ROW_LIMIT = len(df)
+    df = df.head(ROW_LIMIT)
+
+    df = preprocess_products(df)
+    df = preprocess_pairs(df)
+
     log.info(df['decision'].value_counts(normalize=True))
     log.info(len(df))
 
@@ -0,0 +1,122 @@
+"""
+Chunked version of preprocess_mumford_data for exports that do not fit in memory.
+
+The export is read in chunks and the row-wise steps run on each chunk. The products are then spilled to Parquet,
+each row tagged with a hash bucket of its 'matching_engine_candidate_id' so that every candidate group lands whole
+in one bucket. Once every chunk is spilled, consecutive buckets are packed into partitions of at most
+partition_rows products, and the pairing steps run one partition at a time. Peak memory is a chunk or a
+partition, not the export, and the number of partitions grows with the export.
+"""
+import logging
+import os
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from ...extras.datasets.parquet_partitions import partition_path, write_parquet
+from .nodes import preprocess_pairs, preprocess_products
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 100000
+# Hash buckets of the candidate groups, the units partitions are packed from. Many more than partitions, so that
+# a partition can be filled close to partition_rows.
+N_BUCKETS = 2 ** 16
+BUCKET_COLUMN = '_bucket'
+# Row groups of the spilled chunks. Their bucket statistics let a partition's read skip the other partitions'
+# row groups, so the chunks are not read whole once per partition.
+SPILL_ROW_GROUP_SIZE = 10000
+
+# Read every column with a fixed type, so the spilled chunks agree on their schema.
+EXPORT_DTYPES = {
+    'decision': str,
+    'matching_engine_candidate_id': str,
+    'confidence': float,
+    'client_name': str,
+    'name': str,
+    'attrs': str,
+    'member_type': str,
+    'external_id': str,
+    'description': str,
+}
+
+
+def read_export_chunks(source, chunk_size: int = CHUNK_SIZE) -> Iterable[pd.DataFrame]:
+    """
+    Reads a Mumford export CSV (a path or a file-like object such as an S3 response body) chunk by chunk.
+    """
+    return pd.read_csv(source, chunksize=chunk_size, dtype=EXPORT_DTYPES)
+
+
+def _bucket_of(group_ids: pd.Series) -> np.ndarray:
+    return (pd.util.hash_pandas_object(group_ids, index=False).to_numpy() % N_BUCKETS).astype(np.int32)
+
+
+def pack_buckets(bucket_rows: np.ndarray, partition_rows: int) -> List[tuple]:
+    """
+    Packs consecutive buckets into partitions of at most partition_rows rows, given the rows of each bucket.
+    Returns the [start, stop) bucket range of every non-empty partition. A bucket larger than partition_rows
+    is a partition of its own.
+    """
+    ranges, start, rows = [], 0, 0
+    for bucket, n in enumerate(bucket_rows.tolist()):
+        if rows and rows + n > partition_rows:
+            ranges.append((start, bucket))
+            start, rows = bucket, 0
+        rows += n
+    if rows:
+        ranges.append((start, len(bucket_rows)))
+    return ranges
+
+
+def preprocess_mumford_data_chunked(
+    chunks: Iterable[pd.DataFrame], spill_dir: str, partition_rows: int = CHUNK_SIZE
+) -> List[str]:
+    """
+    Runs the data engineering steps over an iterable of export chunks and writes the lead / candidate pairs to
+    one Parquet file per partition under spill_dir/pairs, in the same layout as PartitionedParquetDataSet.
+    Partitions hold at most partition_rows products, unless a single bucket of groups is larger.
+    Returns the paths of the files, in partition order.
+    """
+    products_dir = os.path.join(spill_dir, 'products')
+    pairs_dir = os.path.join(spill_dir, 'pairs')
+    os.makedirs(products_dir, exist_ok=True)
+
+    # Each chunk is written sorted by bucket, so reading one partition skips the row groups of the others.
+    chunk_paths = []
+    bucket_rows = np.zeros(N_BUCKETS, dtype=np.int64)
+    for c, chunk in enumerate(chunks):
+        products = preprocess_products(chunk)
+        buckets = _bucket_of(products['matching_engine_candidate_id'])
+        order = np.argsort(buckets, kind='stable')
+        products = products.iloc[order].assign(**{BUCKET_COLUMN: buckets[order]})
+        bucket_rows += np.bincount(buckets, minlength=N_BUCKETS)
+
+        chunk_paths.append(os.path.join(products_dir, f'chunk-{c:05d}.parquet'))
+        write_parquet(products, chunk_paths[-1], row_group_size=SPILL_ROW_GROUP_SIZE)
+        log.info(f"Data Engineering - Spilled chunk {c} ({len(chunk)} rows)")
+
+    ranges = pack_buckets(bucket_rows, partition_rows)
+    log.info(f"Data Engineering - {int(bucket_rows.sum())} products in {len(ranges)} partitions")
+
+    os.makedirs(pairs_dir, exist_ok=True)
+    paths = []
+    decisions = pd.Series(dtype=float)
+    for k, (start, stop) in enumerate(ranges):
+        filters = [(BUCKET_COLUMN, '>=', start), (BUCKET_COLUMN, '<', stop)]
+        products = pd.concat(
+            [pq.read_table(path, filters=filters).to_pandas() for path in chunk_paths], ignore_index=True,
+        ).drop(columns=BUCKET_COLUMN)
+        pairs = preprocess_pairs(products)
+        decisions = decisions.add(pairs['decision'].value_counts(), fill_value=0)
+
+        path = partition_path(pairs_dir, k)
+        write_parquet(pairs, path)
+        paths.append(path)
+
+    log.info(decisions / decisions.sum())
+    log.info(int(decisions.sum()))
+
+    return paths
@@ -0,0 +1,136 @@
+"""
+Evaluation of a fitted model on held-out pairs from a single predict_proba pass. promotion_check reads its gates
+from the result, and the same probabilities give a precision / recall sweep over confidence thresholds, the full
+precision / coverage curve with a recommended threshold, and a per-client breakdown.
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from .scoring import APPROVED, CONFIDENCE_THRESHOLD
+
+THRESHOLDS = np.round(np.arange(0.50, 1.00, 0.01), 2)
+
+# Promotion gates. PRECISION_MODIFIER accounts the error rate of moderator decisions.
+PRECISION_MODIFIER = 0.015
+TARGET_PRECISION = 0.98
+LOSS_TARGET = 0.29
+
+
+class Evaluation(NamedTuple):
+    log_loss: float
+    # Precision of auto-approving at CONFIDENCE_THRESHOLD, before the PRECISION_MODIFIER adjustment.
+    precision: float
+    # The classification report of the model's own predictions, as text.
+    report: str
+    # One row per threshold: approved (pairs at or above it), coverage, precision and recall of APPROVED.
+    sweep: pd.DataFrame
+    # One row per client, sorted by pairs: log loss and the precision, recall and coverage at CONFIDENCE_THRESHOLD.
+    clients: pd.DataFrame
+    # The row of precision_coverage_curve that recommend_threshold picks, None if no threshold reaches the target.
+    recommendation: Optional[pd.Series]
+
+
+def approval_rates(approval_probabilities: np.ndarray, is_approved: np.ndarray, thresholds: np.ndarray) -> pd.DataFrame:
+    """
+    Precision, recall and coverage of auto-approving the pairs whose probability reaches each threshold,
+    from one sort of the probabilities.
+    """
+    order = np.argsort(-approval_probabilities, kind='stable')
+    true_positives = np.concatenate([[0], np.cumsum(is_approved[order])])
+    # Number of pairs at or above each threshold.
+    approved = np.searchsorted(-approval_probabilities[order], -np.asarray(thresholds), side='right')
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return pd.DataFrame({
+            'threshold': thresholds,
+            'approved': approved,
+            'coverage': approved / max(len(order), 1),
+            # No approvals has precision 0, as precision_score reports it.
+            'precision': np.where(approved > 0, true_positives[approved] / approved, 0.0),
+            'recall': true_positives[approved] / max(is_approved.sum(), 1),
+        })
+
+
+def precision_coverage_curve(
+    approval_probabilities: np.ndarray, is_approved: np.ndarray, precision_modifier: float = PRECISION_MODIFIER
+) -> pd.DataFrame:
+    """
+    The precision and coverage of auto-approving at every distinct probability, highest threshold first.
+    One sort and cumulative counts, O(n log n) in the number of pairs. calibrated_precision adds precision_modifier.
+    """
+    columns = ['threshold', 'approved', 'coverage', 'precision', 'calibrated_precision', 'recall']
+    if not len(approval_probabilities):
+        return pd.DataFrame(columns=columns)
+
+    order = np.argsort(-approval_probabilities, kind='stable')
+    probabilities = approval_probabilities[order]
+    true_positives = np.cumsum(is_approved[order])
+    # Thresholding at a probability approves every pair down to its last occurrence.
+    last = np.flatnonzero(np.append(probabilities[1:] != probabilities[:-1], True))
+    approved = last + 1
+    precision = true_positives[last] / approved
+
+    return pd.DataFrame({
+        'threshold': probabilities[last],
+        'approved': approved,
+        'coverage': approved / len(probabilities),
+        'precision': precision,
+        'calibrated_precision': precision + precision_modifier,
+        'recall': true_positives[last] / max(true_positives[-1], 1),
+    }, columns=columns)
+
+
+def recommend_threshold(curve: pd.DataFrame, target_precision: float = TARGET_PRECISION) -> Optional[pd.Series]:
+    """
+    The row of a precision_coverage_curve that auto-approves the most pairs while its calibrated precision
+    still reaches target_precision, or None when no threshold does.
+    """
+    passing = curve[curve['calibrated_precision'] >= target_precision]
+    if passing.empty:
+        return None
+    return passing.loc[passing['approved'].idxmax()]
+
+
+def evaluate(model, x_test: pd.DataFrame, y_test: np.ndarray, clients: np.ndarray = None, thresholds: np.ndarray = THRESHOLDS) -> Evaluation:
+    """
+    Scores x_test once and derives every metric from those probabilities. clients, the client name of each
+    test pair, adds the per-client breakdown.
+    """
+    from sklearn.metrics import classification_report, log_loss
+
+    y_test = np.asarray(y_test)
+    probabilities = model.predict_proba(x_test)
+    classes = list(model.classes_)
+    approval_probabilities = probabilities[:, classes.index(APPROVED)]
+    is_approved = y_test == APPROVED
+    predicted = model.classes_.take(np.argmax(probabilities, axis=1))
+
+    at_threshold = approval_rates(approval_probabilities, is_approved, np.array([CONFIDENCE_THRESHOLD]))
+    breakdown = pd.DataFrame(columns=['client', 'pairs', 'log_loss', 'precision', 'recall', 'coverage'])
+    if clients is not None:
+        rows = []
+        codes, names = pd.factorize(np.asarray(clients))
+        for c, name in enumerate(names):
+            rows_of_client = codes == c
+            rates = approval_rates(approval_probabilities[rows_of_client], is_approved[rows_of_client], np.array([CONFIDENCE_THRESHOLD]))
+            rows.append({
+                'client': name,
+                'pairs': int(rows_of_client.sum()),
+                'log_loss': log_loss(y_test[rows_of_client], probabilities[rows_of_client], labels=classes),
+                'precision': rates['precision'][0],
+                'recall': rates['recall'][0],
+                'coverage': rates['coverage'][0],
+            })
+        if rows:
+            breakdown = pd.DataFrame(rows).sort_values('pairs', ascending=False, ignore_index=True)
+
+    return Evaluation(
+        log_loss=log_loss(y_test, probabilities, labels=classes),
+        precision=at_threshold['precision'][0],
+        report=classification_report(y_test, predicted, digits=4),
+        sweep=approval_rates(approval_probabilities, is_approved, thresholds),
+        clients=breakdown,
+        recommendation=recommend_threshold(precision_coverage_curve(approval_probabilities, is_approved)),
+    )
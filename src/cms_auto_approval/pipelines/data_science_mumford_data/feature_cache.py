@@ -0,0 +1,109 @@
+"""
+Persistent cache of the feature matrix, so retraining on the same pairs (e.g. when only model parameters change)
+skips feature extraction. Entries are keyed on a fingerprint of the input data and a hash of the feature code,
+and stored as .npy files that are memory-mapped on load.
+"""
+import hashlib
+import inspect
+import logging
+import os
+import shutil
+import tempfile
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from ...hashing import hash_dataframe
+from ...profiling import profiled
+from . import features as feature_module
+from . import groups as groups_module
+from . import similarity as similarity_module
+from .features import INPUT_COLUMNS, compute_feature_matrix_parallel
+
+log = logging.getLogger(__name__)
+
+# Bump to invalidate every cache entry, e.g. when a dependency changes what the feature code computes.
+FEATURE_VERSION = 1
+# Bump when the files of a cache entry change, so that entries in an older layout are not read.
+CACHE_LAYOUT = 2
+LABEL_COLUMN = 'decision'
+GROUP_COLUMN = 'matching_engine_candidate_id'
+
+
+def feature_code_hash() -> str:
+    digest = hashlib.blake2b(str(FEATURE_VERSION).encode(), digest_size=16)
+    for module in (feature_module, groups_module, similarity_module):
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()
+
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Digest of the columns the features and labels are built from, ignoring the index.
+    """
+    return hash_dataframe(df, columns=INPUT_COLUMNS + [LABEL_COLUMN], index=False)
+
+
+def _encode(values: pd.Series) -> tuple:
+    """
+    Labels and group ids are stored without pickling, as their codes and distinct values. Missing values keep the
+    code -1 and come back as NaN. Returns None for object columns that hold anything but strings, which cannot be
+    stored as fixed width unicode and read back unchanged.
+    """
+    codes, uniques = pd.factorize(values)
+    uniques = uniques.to_numpy()
+    if uniques.dtype == object:
+        if not all(isinstance(value, str) for value in uniques):
+            return None
+        uniques = uniques.astype(str)
+    return codes.astype(np.int64), uniques, np.array(values.dtype == object)
+
+def _decode(codes: np.ndarray, uniques: np.ndarray, is_object: np.ndarray) -> np.ndarray:
+    # The values as values.to_numpy() gives them on a cache miss, with the same dtype.
+    uniques = uniques.astype(object) if is_object else uniques
+    if (codes < 0).any():
+        uniques = np.append(uniques, np.array([np.nan], dtype=uniques.dtype if uniques.dtype.kind in 'fO' else float))
+    return uniques[codes]
+
+@profiled()
+def cached_features(df: pd.DataFrame, cache_dir: str = None, n_jobs: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the feature matrix, labels and group ids of the pairs. With a cache_dir they are read from the cache
+    when the same data has already been featurized by the same feature code, and written to it otherwise.
+    Labels and group ids have the same dtype and values either way. The cached feature matrix is a read-only
+    memory map.
+    """
+    features = lambda: compute_feature_matrix_parallel(df, n_jobs=n_jobs)
+    labels, groups = df[LABEL_COLUMN].to_numpy(), df[GROUP_COLUMN].to_numpy()
+    if not cache_dir:
+        return features(), labels, groups
+
+    entry = os.path.join(cache_dir, f'{data_fingerprint(df)}-{feature_code_hash()}-{CACHE_LAYOUT}')
+    columns = [LABEL_COLUMN, GROUP_COLUMN]
+    names = ['codes', 'uniques', 'is_object']
+    if os.path.isdir(entry):
+        log.info('Data Science - Loading cached features from ' + entry)
+        load = lambda name: np.load(os.path.join(entry, name + '.npy'), mmap_mode='r', allow_pickle=False)
+        return (load('features'),) + tuple(_decode(*(load(column + '.' + name) for name in names)) for column in columns)
+
+    encoded = [_encode(df[column]) for column in columns]
+    matrix = features()
+    if any(arrays is None for arrays in encoded):
+        log.info('Data Science - Not caching features, the labels or group ids are not strings or numbers')
+        return matrix, labels, groups
+
+    # Write into a temporary directory and rename it, so a concurrent or interrupted run never sees half an entry.
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=cache_dir)
+    np.save(os.path.join(staging, 'features.npy'), matrix, allow_pickle=False)
+    for column, arrays in zip(columns, encoded):
+        for name, array in zip(names, arrays):
+            np.save(os.path.join(staging, column + '.' + name + '.npy'), array, allow_pickle=False)
+    try:
+        os.rename(staging, entry)
+        log.info('Data Science - Cached features in ' + entry)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    return matrix, labels, groups
@@ -0,0 +1,306 @@
+"""
+Feature engine for the lead / candidate pairs produced by data engineering.
+compute_feature_matrix gives the same 14 features as the row-wise functions in nodes.py, as a float32 block,
+using column operations, per-distinct-value work and the token-ID kernels in similarity.py instead of df.apply.
+The pairwise features are computed once per distinct pair of inputs, as the same products recur across many
+candidate groups.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .groups import GroupIndex
+from .similarity import jaccard_scores, tokenize
+
+# Model input order, shared by training, export and scoring.
+FEATURE_COLUMNS = [
+    'confidence', 'jaccard_sim_score', 'jaccard_sim_score_desc', 'is_product_code_in_pair', 'is_same_client',
+    'match_external_id', 'mpn_match', 'lead_desc_word_count', 'other_desc_word_count', 'lead_name_word_count',
+    'other_name_word_count', 'group_xid', 'group_jaccard', 'group_jaccard_desc',
+]
+# Columns of the pairs that the features are computed from.
+INPUT_COLUMNS = [
+    'matching_engine_candidate_id', 'confidence', 'lead.name', 'other.name', 'lead.description', 'other.description',
+    'lead.mpns', 'other.mpns', 'lead.model_nos', 'other.model_nos', 'lead.external_id', 'other.external_id',
+    'lead.client_name', 'other.client_name',
+]
+# Group feature -> (statistic over the candidate group, pair feature), see GroupIndex for the statistics.
+GROUP_FEATURES = {
+    'group_jaccard': ('mean', 'jaccard_sim_score'),
+    'group_xid': ('mean', 'confidence'),
+    'group_jaccard_desc': ('mean', 'jaccard_sim_score_desc'),
+}
+
+
+def is_string_like_product_code(input_str: str) -> bool:
+
+    # intializing flag variable
+    flag_l = False
+    flag_n = False
+
+    # checking for letter and numbers in given string
+    for i in input_str:
+
+        # if string has letter
+        if i.isalpha():
+            flag_l = True
+
+        # if string has number
+        if i.isdigit():
+            flag_n = True
+
+        if flag_l and flag_n:
+            return True
+
+    return False
+
+def clean_mpn(mpns):
+    cleaned_mpns = []
+    mpns = mpns.split(',')
+    for mpn in mpns:
+        mpn = str(mpn).lower()
+        mpn = re.sub(r'[\W_]+', '', mpn)
+        cleaned_mpns.append(mpn)
+    return cleaned_mpns
+
+def identifiers(values) -> list:
+    """
+    Normalized identifiers for one product, taken from the list columns written by data engineering.
+    Older stringified '[a, b]' columns (e.g. read back from CSV) are still cleaned here.
+    No identifiers are represented as [''], which is what clean_mpn gives for '[]'.
+    """
+    if isinstance(values, str):
+        return clean_mpn(values)
+    return list(values) if len(values) else ['']
+
+def partial_match(listA, listB):
+    stringA = ",".join(listA) # turn list into a string with comma separated values
+    partial_matches = [i for i in listB if i in stringA] # add any values in listB that are found in stringA to their own list
+    if partial_matches:
+        longest_match = len(max(partial_matches, key=len)) # check for length of longest match - we want it to be at least 5 characters to reduce false positives
+        return longest_match
+    return 0
+
+def mpn_match_score(lead_mpn: list, other_mpn: list, lead_model_no: list, other_model_no: list) -> float:
+    """
+    Scores the identifiers of a pair: 1 for a full match, 0.75 for a partial match of at least 5 characters.
+    """
+    longest_match_case1 = partial_match(lead_mpn, other_model_no)      # other MODEL_NUMBER is in lead MPN
+    longest_match_case2 = partial_match(lead_model_no, other_mpn)      # other MPN is in lead MODEL_NUMBER
+    longest_match_case3 = partial_match(other_mpn, lead_model_no)      # lead MODEL_NUMBER is in other MPN
+    longest_match_case4 = partial_match(other_model_no, lead_mpn)      # lead MPN is in other MODEL_NUMBER
+
+    #full confidence if full match between...
+    if (lead_mpn[0] != '' and
+        (set(lead_mpn) & set(other_mpn) or          #...lead and other MPNs
+        set(lead_mpn) & set(other_model_no) or      #...lead MPN and other MODEL_NUMBER
+        set(lead_model_no) & set(other_mpn))        #...lead MODEL_NUMBER and other MPN
+        ):
+        return 1
+
+    #partial confidence if partial match where...
+    elif (lead_mpn[0] != '' and
+        ((longest_match_case1 > 4) or       # check partial match is at least 5 chars
+        (longest_match_case2 > 4) or
+        (longest_match_case3 > 4) or
+        (longest_match_case4 > 4))
+        ):
+        return 0.75 # score chosen based on the fact that a partial match is not as good as a full match, but 5 matching chars are still significant
+
+    return 0
+
+
+def _per_distinct(values: pd.Series, func, missing) -> tuple:
+    # Applies func once per distinct value. Returns the row codes and the results, with missing values last (code -1).
+    codes, uniques = pd.factorize(values)
+    return codes, [func(value) for value in uniques] + [missing]
+
+def _distinct_identifiers(values: pd.Series) -> tuple:
+    # Row codes of the distinct identifier lists of a column, and those lists. Lists are compared by content, as
+    # rows read back from parquet no longer share list objects, but rows sharing a list object are keyed once.
+    values = values.to_numpy()
+    object_codes, _ = pd.factorize(np.fromiter(map(id, values), dtype=np.int64, count=len(values)))
+    _, first_rows = np.unique(object_codes, return_index=True)
+    distinct = {}
+    codes = np.fromiter(
+        (distinct.setdefault(value if isinstance(value, str) else tuple(value), len(distinct)) for value in values[first_rows]),
+        dtype=np.int64, count=len(first_rows),
+    )
+    return codes[object_codes], list(distinct)
+
+def contains_any(text: str, patterns) -> bool:
+    """
+    Whether any of the patterns is a substring of text. Each test is CPython's C substring search, which for the
+    few identifiers or product codes of a product beats building a multi-pattern automaton per product.
+    """
+    for pattern in patterns:
+        if pattern in text:
+            return True
+    return False
+
+def per_distinct_pair(compute, *codes: np.ndarray) -> np.ndarray:
+    """
+    Memoizes a pairwise feature on its inputs: codes identify the distinct input values of each row, e.g. the lead
+    and other texts. compute(rows) is called on the first row of each distinct combination only and its results
+    are broadcast back to every row with the same inputs. Codes may be negative, e.g. the -1 pd.factorize gives
+    missing values, which is then a distinct input of its own.
+    """
+    key = np.zeros(len(codes[0]), dtype=np.int64)
+    for column in codes:
+        if not len(column):
+            break
+        # Shifted to start at 0, the combined key only has no collisions for non-negative codes.
+        column = np.asarray(column, dtype=np.int64) - min(int(column.min()), 0)
+        # Re-factorizing after each column keeps the combined key below len(rows) ** 2.
+        key, _ = pd.factorize(key * (int(column.max()) + 1) + column)
+    _, first = np.unique(key, return_index=True)
+    return np.asarray(compute(first))[key]
+
+# A token with both a letter and a digit, found in a whole ASCII text with one regex scan. On ASCII text,
+# where isalpha and isdigit are [A-Za-z] and [0-9], it gives the tokens is_string_like_product_code accepts.
+PRODUCT_CODE = re.compile(r'(?<!\S)(?=\S*[A-Za-z])(?=\S*[0-9])\S+')
+
+def product_codes(text) -> list:
+    """
+    The product-code-like tokens of a text, in order. Text that is not ASCII is checked token by token.
+    """
+    if not isinstance(text, str):
+        return []
+    if text.isascii():
+        return PRODUCT_CODE.findall(text)
+    return [t for t in text.split() if is_string_like_product_code(t)]
+
+def product_code_in_pair(lead_name: pd.Series, other_name: pd.Series) -> np.ndarray:
+    """
+    Batched is_product_code_in_pair: product codes are found once per distinct lead name. Pairs whose lead name
+    has none are False without a look at the other name, the rest are checked once per distinct pair.
+    """
+    codes, lead_product_codes = _per_distinct(lead_name, product_codes, [])
+    other_codes, other_names = pd.factorize(other_name)
+    other_names = np.append(other_names.to_numpy(dtype=object), None)
+    # Missing names are coded -1, which picks up the trailing missing value.
+    lead_codes = codes.astype(np.int64) % len(lead_product_codes)
+    other_codes = other_codes.astype(np.int64) % len(other_names)
+
+    has_codes = np.array([len(found) > 0 for found in lead_product_codes], dtype=bool)[lead_codes]
+    rows = np.flatnonzero(has_codes)
+    lead_codes, other_codes = lead_codes[rows], other_codes[rows]
+
+    def check(pairs):
+        return np.array([
+            isinstance(other, str) and contains_any(other, lead_product_codes[c])
+            for c, other in zip(lead_codes[pairs].tolist(), other_names[other_codes[pairs]])
+        ], dtype=bool)
+
+    in_pair = np.zeros(len(has_codes), dtype=bool)
+    in_pair[rows] = per_distinct_pair(check, lead_codes, other_codes)
+    return in_pair
+
+def _partial_match(listA: list, listB: list) -> bool:
+    # partial_match(listA, listB) > 4: only identifiers longer than 4 characters are searched for.
+    return contains_any(','.join(listA), [value for value in listB if len(value) > 4])
+
+def _mpn_match(lead_mpn: list, other_mpn: list, lead_model_no: list, other_model_no: list) -> float:
+    # mpn_match_score of a lead that has MPNs. The partial matches are only searched for without a full match.
+    lead_mpns = set(lead_mpn)
+    if not (
+        lead_mpns.isdisjoint(other_mpn)
+        and lead_mpns.isdisjoint(other_model_no)
+        and set(lead_model_no).isdisjoint(other_mpn)
+    ):
+        return 1
+    if (
+        _partial_match(lead_mpn, other_model_no)
+        or _partial_match(lead_model_no, other_mpn)
+        or _partial_match(other_mpn, lead_model_no)
+        or _partial_match(other_model_no, lead_mpn)
+    ):
+        return 0.75
+    return 0
+
+def mpn_match_scores(df: pd.DataFrame) -> np.ndarray:
+    """
+    Batched mpn_match_score. Pairs whose lead has no MPN score 0 without comparing, the others are scored once per
+    distinct combination of the four identifier lists.
+    """
+    columns = [_distinct_identifiers(df[c]) for c in ['lead.mpns', 'other.mpns', 'lead.model_nos', 'other.model_nos']]
+    lead_mpns, distinct_lead_mpns = columns[0]
+    has_mpn = np.array([identifiers(values)[0] != '' for values in distinct_lead_mpns], dtype=bool)[lead_mpns]
+    rows = np.flatnonzero(has_mpn)
+
+    codes, lists = [], []
+    for column_codes, distinct in columns:
+        codes.append(column_codes[rows])
+        lists.append({c: identifiers(distinct[c]) for c in np.unique(codes[-1]).tolist()})
+
+    def score(pairs):
+        return np.array([
+            _mpn_match(*(column_lists[c] for column_lists, c in zip(lists, pair)))
+            for pair in zip(*(column_codes[pairs].tolist() for column_codes in codes))
+        ], dtype=np.float64)
+
+    scores = np.zeros(len(df), dtype=np.float64)
+    scores[rows] = per_distinct_pair(score, *codes)
+    return scores
+
+def compute_feature_matrix(df: pd.DataFrame) -> np.ndarray:
+    """
+    Returns the model features of every pair as a float32 array, with columns in FEATURE_COLUMNS order.
+    """
+    names = tokenize(df['lead.name'], df['other.name'])
+    descriptions = tokenize(df['lead.description'], df['other.description'])
+    lead_name, other_name = names.codes
+    lead_description, other_description = descriptions.codes
+
+    features = {
+        'confidence': df['confidence'].astype(float).to_numpy(),
+        'mpn_match': mpn_match_scores(df),
+        'jaccard_sim_score': per_distinct_pair(
+            lambda rows: jaccard_scores(names, lead_name[rows], other_name[rows]), lead_name, other_name
+        ),
+        'jaccard_sim_score_desc': per_distinct_pair(
+            lambda rows: jaccard_scores(descriptions, lead_description[rows], other_description[rows]),
+            lead_description, other_description,
+        ),
+        'match_external_id': (df['lead.external_id'] == df['other.external_id']).to_numpy(),
+        'is_product_code_in_pair': product_code_in_pair(df['lead.name'], df['other.name']),
+        'is_same_client': (df['lead.client_name'] == df['other.client_name']).to_numpy(),
+        'lead_name_word_count': names.word_counts[lead_name],
+        'other_name_word_count': names.word_counts[other_name],
+        'lead_desc_word_count': descriptions.word_counts[lead_description],
+        'other_desc_word_count': descriptions.word_counts[other_description],
+    }
+
+    # The group key is factorized once for all of the group features.
+    groups = GroupIndex(df['matching_engine_candidate_id'])
+    for column, (statistic, source) in GROUP_FEATURES.items():
+        features[column] = groups.aggregate(statistic, features[source])
+
+    matrix = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float32)
+    for i, column in enumerate(FEATURE_COLUMNS):
+        matrix[:, i] = features[column]
+    return matrix
+
+
+def compute_feature_matrix_parallel(df: pd.DataFrame, n_jobs: int = 1) -> np.ndarray:
+    """
+    compute_feature_matrix over a process pool. Rows are partitioned by 'matching_engine_candidate_id', so every
+    group is computed whole in one worker and the group means are unaffected, and the chunks are written back
+    to their original row positions. n_jobs=-1 uses every core.
+    """
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    if n_jobs <= 1 or len(df) == 0:
+        return compute_feature_matrix(df)
+
+    group_codes, _ = pd.factorize(df['matching_engine_candidate_id'])
+    chunks = [np.flatnonzero(group_codes % n_jobs == k) for k in range(n_jobs)]
+    chunks = [rows for rows in chunks if len(rows)]
+
+    matrix = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float32)
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        for rows, features in zip(chunks, pool.map(compute_feature_matrix, (df.iloc[rows] for rows in chunks))):
+            matrix[rows] = features
+    return matrix
@@ -0,0 +1,96 @@
+"""
+Statistics of the pair features over their matching engine candidate group, broadcast back to the pairs.
+
+A GroupIndex factorizes the group key once. Every statistic is then computed from its codes with np.bincount, or
+from one cached sort of the rows by group, so adding statistics does not re-hash the key. The results agree with
+df.groupby(key)[column].transform(statistic): missing values are skipped and rows with a missing key get NaN.
+"""
+import numpy as np
+import pandas as pd
+
+STATISTICS = ['mean', 'sum', 'std', 'min', 'max', 'rank']
+
+
+class GroupIndex:
+
+    def __init__(self, keys: pd.Series):
+        codes, uniques = pd.factorize(keys)
+        self.n_groups = len(uniques)
+        # Rows with a missing key belong to no group. They get the extra code n_groups and NaN statistics.
+        self.missing = codes == -1
+        self.codes = np.where(self.missing, self.n_groups, codes)
+        self._order = None
+
+    @property
+    def order(self) -> np.ndarray:
+        # Row positions sorted by group, stable. Computed on first use and shared by the order based statistics.
+        if self._order is None:
+            self._order = np.argsort(self.codes, kind='stable')
+        return self._order
+
+    def _counts(self, weights: np.ndarray = None) -> np.ndarray:
+        return np.bincount(self.codes, weights=weights, minlength=self.n_groups + 1)
+
+    def _broadcast(self, per_group: np.ndarray) -> np.ndarray:
+        values = per_group[self.codes].astype(np.float64)
+        values[self.missing] = np.nan
+        return values
+
+    def _reduce(self, ufunc: np.ufunc, values: np.ndarray) -> np.ndarray:
+        # Each group is a contiguous run of the sorted values, the appended NaN keeps every run start in range.
+        counts = self._counts()
+        starts = np.cumsum(counts) - counts
+        return ufunc.reduceat(np.append(values[self.order], np.nan), starts)
+
+    def sum(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        return self._broadcast(self._counts(np.where(np.isnan(values), 0, values)))
+
+    def mean(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.sum(values) / self._broadcast(self._counts(~np.isnan(values)))
+
+    def std(self, values: np.ndarray, ddof: int = 1) -> np.ndarray:
+        # Two passes, the squared deviations from the group mean rather than from zero, for numerical stability.
+        values = np.asarray(values, dtype=np.float64)
+        deviations = np.square(values - self.mean(values))
+        degrees_of_freedom = self._broadcast(self._counts(~np.isnan(values))) - ddof
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(degrees_of_freedom > 0, np.sqrt(self.sum(deviations) / degrees_of_freedom), np.nan)
+
+    def min(self, values: np.ndarray) -> np.ndarray:
+        # fmin / fmax skip NaN unless a whole group is NaN.
+        return self._broadcast(self._reduce(np.fmin, np.asarray(values, dtype=np.float64)))
+
+    def max(self, values: np.ndarray) -> np.ndarray:
+        return self._broadcast(self._reduce(np.fmax, np.asarray(values, dtype=np.float64)))
+
+    def rank(self, values: np.ndarray) -> np.ndarray:
+        """
+        Ascending rank within the group, starting at 1, ties get the average of their ranks.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return values
+        order = np.lexsort((values, self.codes))
+        codes, sorted_values = self.codes[order], values[order]
+
+        positions = np.arange(len(order))
+        new_group = np.concatenate([[True], codes[1:] != codes[:-1]])
+        group_start = np.maximum.accumulate(np.where(new_group, positions, 0))
+        # Runs of equal values, NaN never equals itself so it is a run of one.
+        new_run = new_group | np.concatenate([[True], sorted_values[1:] != sorted_values[:-1]])
+        run_starts = np.flatnonzero(new_run)
+        run_ends = np.append(run_starts[1:], len(order))
+        middle = (run_starts + run_ends - 1) / 2
+
+        ranks = np.empty(len(order), dtype=np.float64)
+        ranks[order] = middle[np.cumsum(new_run) - 1] - group_start + 1
+        ranks[np.isnan(values) | self.missing] = np.nan
+        return ranks
+
+    def aggregate(self, statistic: str, values: np.ndarray) -> np.ndarray:
+        if statistic not in STATISTICS:
+            raise ValueError(f"Unknown group statistic '{statistic}', expected one of {STATISTICS}")
+        return getattr(self, statistic)(values)
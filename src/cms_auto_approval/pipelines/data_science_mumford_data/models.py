@@ -0,0 +1,107 @@
+"""
+The model families fit_model can train, selected with the 'model_backend' Kedro parameter.
+
+gradient_boosting is the original exact-split GradientBoostingClassifier. hist_gradient_boosting bins the
+features into histograms and fits multi-threaded, which keeps training practical on millions of rows.
+It stops adding trees once the log loss of a held-out split of the training groups stops improving.
+Both export to ONNX through export_onnx.
+"""
+import logging
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from ...profiling import profiled
+
+# sklearn is imported where a model is split or fitted, so that importing the pipeline does not load it.
+if TYPE_CHECKING:
+    from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+
+log = logging.getLogger(__name__)
+
+GRADIENT_BOOSTING = 'gradient_boosting'
+HIST_GRADIENT_BOOSTING = 'hist_gradient_boosting'
+BACKENDS = [GRADIENT_BOOSTING, HIST_GRADIENT_BOOSTING]
+
+# Early stopping of hist_gradient_boosting: trees are added EARLY_STOPPING_STEP at a time, up to MAX_ITER, until
+# the validation loss has not improved by TOLERANCE for PATIENCE steps.
+MAX_ITER = 1000
+EARLY_STOPPING_STEP = 10
+PATIENCE = 3
+TOLERANCE = 1e-4
+VALIDATION_FRACTION = 0.2
+
+
+def promotion_split(groups: np.ndarray) -> tuple:
+    """
+    The train / test row indices of fit_model: half of the candidate groups each.
+    """
+    from sklearn.model_selection import GroupShuffleSplit
+
+    return next(GroupShuffleSplit(test_size=.5, n_splits=2, random_state = 7).split(groups, groups=groups))
+
+
+def make_gradient_boosting(**params) -> 'GradientBoostingClassifier':
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    model = GradientBoostingClassifier(n_estimators=100, max_features=7, min_samples_split = 200, max_depth=5, min_samples_leaf=45, subsample=0.9, random_state=2)
+    return model.set_params(**params)
+
+
+def make_hist_gradient_boosting(max_iter: int = MAX_ITER, **params) -> 'HistGradientBoostingClassifier':
+    # Same tree shape as make_gradient_boosting, early stopping is done by fit_hist_gradient_boosting.
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    model = HistGradientBoostingClassifier(
+        max_iter=max_iter, learning_rate=0.1, max_depth=5, min_samples_leaf=45, early_stopping=False, random_state=2
+    )
+    return model.set_params(**params)
+
+
+def fit_hist_gradient_boosting(x_train: pd.DataFrame, y_train: np.ndarray, groups: np.ndarray, **params) -> 'HistGradientBoostingClassifier':
+    """
+    Fits on all but a VALIDATION_FRACTION of the candidate groups, growing the model until the log loss on those
+    groups stops improving, then refits on all of x_train with the best number of trees.
+    HistGradientBoostingClassifier's own early stopping splits rows at random, which would leak groups.
+    """
+    from sklearn.metrics import log_loss
+    from sklearn.model_selection import GroupShuffleSplit
+
+    fit_inds, validation_inds = next(
+        GroupShuffleSplit(test_size=VALIDATION_FRACTION, n_splits=1, random_state=7).split(x_train, groups=groups)
+    )
+    x_fit, y_fit = x_train.iloc[fit_inds], y_train[fit_inds]
+    x_validation, y_validation = x_train.iloc[validation_inds], y_train[validation_inds]
+
+    model = make_hist_gradient_boosting(max_iter=EARLY_STOPPING_STEP, **params)
+    model.set_params(warm_start=True)
+    best_loss, best_iter, stale = np.inf, 0, 0
+    while model.max_iter <= MAX_ITER and stale < PATIENCE:
+        model.fit(x_fit, y_fit)
+        loss = log_loss(y_validation, model.predict_proba(x_validation), labels=model.classes_)
+        if loss < best_loss - TOLERANCE:
+            best_loss, best_iter, stale = loss, model.n_iter_, 0
+        else:
+            stale += 1
+        model.set_params(max_iter=model.max_iter + EARLY_STOPPING_STEP)
+    log.info('Data Science - Early stopping at ' + str(best_iter) + ' trees, validation loss ' + str(best_loss))
+
+    return make_hist_gradient_boosting(max_iter=best_iter, **params).fit(x_train, y_train)
+
+
+@profiled()
+def fit_backend(backend: str, x_train: pd.DataFrame, y_train: np.ndarray, groups: np.ndarray, n_threads: int = None, params: dict = None):
+    """
+    Fits the model family named by backend, with params overriding its default hyperparameters.
+    n_threads caps the threads of the multi-threaded backends.
+    """
+    params = params or {}
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}', expected one of {BACKENDS}")
+
+    with threadpool_limits(limits=n_threads, user_api='openmp'):
+        if backend == HIST_GRADIENT_BOOSTING:
+            return fit_hist_gradient_boosting(x_train, y_train, groups, **params)
+        return make_gradient_boosting(**params).fit(x_train, y_train)
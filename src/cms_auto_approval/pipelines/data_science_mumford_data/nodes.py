@@ -1,15 +1,35 @@
+import functools
 import warnings
-warnings.filterwarnings('ignore')
 import pandas as pd
 import numpy as np
-import re
-from sklearn.metrics import classification_report
-from sklearn.model_selection import GroupShuffleSplit
-from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.metrics import log_loss
-from sklearn.metrics import precision_score
+from typing import Dict, List
 import logging
 log = logging.getLogger(__name__)
+from .features import (
+    FEATURE_COLUMNS,
+    INPUT_COLUMNS,
+    identifiers,
+    is_string_like_product_code,
+    mpn_match_score,
+)
+from ...profiling import profiled
+from .feature_cache import cached_features
+from .models import GRADIENT_BOOSTING, fit_backend, promotion_split
+from .evaluation import LOSS_TARGET, PRECISION_MODIFIER, TARGET_PRECISION, evaluate
+from .scoring import CONFIDENCE_THRESHOLD
+from .search import search_hyperparameters
+
+def ignore_warnings(func):
+    """
+    Runs the decorated node with warnings ignored. Scoped to the call rather than set when the module is
+    imported, so importing the pipeline leaves the warning filters of the process alone.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return func(*args, **kwargs)
+    return wrapper
 
 def jaccard_similarity(row, col_a: str, col_b:str) -> float:
 
@@ -24,28 +44,6 @@ def jaccard_similarity(row, col_a: str, col_b:str) -> float:
     except:
         return 0
 
-def is_string_like_product_code(input_str: str) -> bool: 
-    
-    # intializing flag variable 
-    flag_l = False
-    flag_n = False
-      
-    # checking for letter and numbers in given string 
-    for i in input_str: 
-        
-        # if string has letter 
-        if i.isalpha(): 
-            flag_l = True
-  
-        # if string has number 
-        if i.isdigit(): 
-            flag_n = True
-        
-        if flag_l and flag_n:
-            return True
-    
-    return False
-
 def is_product_code_in_pair(row) -> bool:
     
     try:
@@ -63,57 +61,14 @@ def is_product_code_in_pair(row) -> bool:
     except: # Defensive coding.   
         return False
 
-def clean_mpn(mpns):
-    cleaned_mpns = []
-    mpns = mpns.split(',')
-    for mpn in mpns:
-        mpn = str(mpn).lower()
-        mpn = re.sub(r'[\W_]+', '', mpn)
-        cleaned_mpns.append(mpn)
-    return cleaned_mpns
-
-def partial_match(listA, listB):
-    stringA = ",".join(listA) # turn list into a string with comma separated values
-    partial_matches = [i for i in listB if i in stringA] # add any values in listB that are found in stringA to their own list
-    if partial_matches:
-        longest_match = len(max(partial_matches, key=len)) # check for length of longest match - we want it to be at least 5 characters to reduce false positives
-        return longest_match
-    return 0
-
 def mpn_match(row):
-    lead_mpns = row['lead.mpns']
-    other_mpns = row['other.mpns']
-    lead_mpn = clean_mpn(lead_mpns)
-    other_mpn = clean_mpn(other_mpns)
-
-    lead_model_nos = row['lead.model_nos']
-    other_model_nos = row['other.model_nos']
-    lead_model_no = clean_mpn(lead_model_nos)
-    other_model_no = clean_mpn(other_model_nos)
-
-    longest_match_case1 = partial_match(lead_mpn, other_model_no)      # other MODEL_NUMBER is in lead MPN
-    longest_match_case2 = partial_match(lead_model_no, other_mpn)      # other MPN is in lead MODEL_NUMBER
-    longest_match_case3 = partial_match(other_mpn, lead_model_no)      # lead MODEL_NUMBER is in other MPN
-    longest_match_case4 = partial_match(other_model_no, lead_mpn)      # lead MPN is in other MODEL_NUMBER
-
-    #full confidence if full match between...
-    if (lead_mpn[0] != '' and
-        (set(lead_mpn) & set(other_mpn) or          #...lead and other MPNs
-        set(lead_mpn) & set(other_model_no) or      #...lead MPN and other MODEL_NUMBER
-        set(lead_model_no) & set(other_mpn))        #...lead MODEL_NUMBER and other MPN
-        ):
-        return 1
-
-    #partial confidence if partial match where...
-    elif (lead_mpn[0] != '' and
-        ((longest_match_case1 > 4) or       # check partial match is at least 5 chars
-        (longest_match_case2 > 4) or
-        (longest_match_case3 > 4) or     
-        (longest_match_case4 > 4))        
-        ):
-        return 0.75 # score chosen based on the fact that a partial match is not as good as a full match, but 5 matching chars are still significant 
-            
-    return 0
+    lead_mpn = identifiers(row['lead.mpns'])
+    other_mpn = identifiers(row['other.mpns'])
+
+    lead_model_no = identifiers(row['lead.model_nos'])
+    other_model_no = identifiers(row['other.model_nos'])
+
+    return mpn_match_score(lead_mpn, other_mpn, lead_model_no, other_model_no)
 
 def is_same_client(row) -> bool:
     return row['lead.client_name'] == row['other.client_name']
@@ -121,8 +76,11 @@ def is_same_client(row) -> bool:
 def match_external_id(row) -> bool:
     return row['lead.external_id'] == row['other.external_id']
 
-def get_features(df: pd.DataFrame) -> pd.DataFrame:
-    # We use the 'matching_engine_candidate_id' here to group members
+def get_features_row_wise(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The original one-row-at-a-time feature code. Not used by the pipeline, train_model computes the features with
+    cached_features. Kept as the reference for the feature engine's parity test and benchmark.
+    """
     df['mpn_match'] = df.apply(mpn_match, axis=1)
     df['confidence'] = df['confidence'].astype(float)
     df['jaccard_sim_score'] = df.apply(jaccard_similarity, args=('lead.name', 'other.name'), axis=1)
@@ -140,60 +98,63 @@ def get_features(df: pd.DataFrame) -> pd.DataFrame:
 
     return df
 
-def convert_bool_features_to_binary(df: pd.DataFrame) -> pd.DataFrame:
-    df["match_external_id"] = df["match_external_id"].astype(int)
-    df["is_product_code_in_pair"] = df["is_product_code_in_pair"].astype(int)
-    df["is_same_client"] = df["is_same_client"].astype(int)
-    return df
+@profiled()
+def promotion_check(x_test: pd.DataFrame, y_test: pd.DataFrame, model, clients: np.ndarray = None) -> bool:
 
-def promotion_check(x_test: pd.DataFrame, y_test: pd.DataFrame, model) -> bool:
-
-    # Accounts the error rate of moderator decisions.
-    PRECISION_MODIFIER = 0.015
-    CONFIDENCE_THRESHOLD = 0.95
-    TARGET_PRECISION = 0.98
-    LOSS_TARGET = 0.29
+    evaluation = evaluate(model, x_test, y_test, clients=clients)
+    log.info("Threshold Sweep:\n" + evaluation.sweep.to_string(index=False))
+    if len(evaluation.clients):
+        log.info("Per Client At " + str(CONFIDENCE_THRESHOLD) + ":\n" + evaluation.clients.to_string(index=False))
+    if evaluation.recommendation is not None:
+        log.info("Recommended Threshold For " + str(TARGET_PRECISION) + " Calibrated Precision:\n" + evaluation.recommendation.to_string())
+    else:
+        log.info("No Threshold Reaches " + str(TARGET_PRECISION) + " Calibrated Precision")
 
-    loss_score = log_loss(y_test, model.predict_proba(x_test))
+    loss_score = evaluation.log_loss
     log.info("Loss Score: " + str(loss_score))
     if loss_score > LOSS_TARGET:
-        log.info("Loss: " + str(log_loss(y_test, model.predict_proba(x_test))))
         return False, "Log loss is > " + str(LOSS_TARGET)
     
-    model_calibrated_output = np.where(model.predict_proba(x_test)[:,0]>=CONFIDENCE_THRESHOLD, 'APPROVED', 'DEFERRED')
-    calibated_precision = (precision_score(y_test, model_calibrated_output, pos_label='APPROVED')) + PRECISION_MODIFIER
+    calibated_precision = evaluation.precision + PRECISION_MODIFIER
     log.info("Calibrated Precision: " + str(calibated_precision))
     if calibated_precision < TARGET_PRECISION: 
         return False, "Precision is <  " + str(TARGET_PRECISION)
 
-    log.info(classification_report(y_test, model.predict(x_test), digits=4))
+    log.info(evaluation.report)
     return True, "All Checks Passed."
 
-def train_model(df: pd.DataFrame):
+@ignore_warnings
+def fit_model(
+    features: np.ndarray,
+    labels: np.ndarray,
+    groups: np.ndarray,
+    backend: str = GRADIENT_BOOSTING,
+    n_threads: int = None,
+    hyperparameters: Dict = None,
+    clients: np.ndarray = None,
+):
     '''
-    Input a 'clean' data frame and output a trained model.
+    Splits, trains and promotion checks a model on a feature matrix in FEATURE_COLUMNS order,
+    with the decision label and matching engine candidate id of every row.
+    backend picks the model family from models.BACKENDS, every family has to pass the same promotion_check.
+    hyperparameters override the backend's defaults, e.g. the best config of search_hyperparameters.
+    clients, the client name of every row, adds a per-client breakdown to the promotion diagnostics.
     '''
-    log.info('Data Science - Starting Model Training')
-    df = get_features(df)
-    df = convert_bool_features_to_binary(df)
-    log.info('Data Science - Acquired Model Features')
-    
     # Split data
-    train_inds, test_inds = next(GroupShuffleSplit(test_size=.5, n_splits=2, random_state = 7).split(df, groups=df['matching_engine_candidate_id'].values))
-    df_train = df.iloc[train_inds]
-    df_test = df.iloc[test_inds]
+    train_inds, test_inds = promotion_split(groups)
 
     # Keep model features
-    x_train = df_train[['confidence', 'jaccard_sim_score', 'jaccard_sim_score_desc', 'is_product_code_in_pair', 'is_same_client', 'match_external_id', 'mpn_match', 'lead_desc_word_count', 'other_desc_word_count', 'lead_name_word_count', 'other_name_word_count', 'group_xid', 'group_jaccard', 'group_jaccard_desc']]
-    y_train = df_train[['decision']]
-    x_test = df_test[['confidence', 'jaccard_sim_score', 'jaccard_sim_score_desc', 'is_product_code_in_pair', 'is_same_client', 'match_external_id', 'mpn_match', 'lead_desc_word_count', 'other_desc_word_count', 'lead_name_word_count', 'other_name_word_count', 'group_xid', 'group_jaccard', 'group_jaccard_desc']]
-    y_test = df_test[['decision']]
+    x_train = pd.DataFrame(features[train_inds], columns=FEATURE_COLUMNS)
+    y_train = labels[train_inds]
+    x_test = pd.DataFrame(features[test_inds], columns=FEATURE_COLUMNS)
+    y_test = labels[test_inds]
 
     # Train
-    model = GradientBoostingClassifier(n_estimators=100, max_features=7, min_samples_split = 200, max_depth=5, min_samples_leaf=45, subsample=0.9, random_state=2)
-    model.fit(x_train,y_train)
+    log.info('Data Science - Fitting ' + backend + ' model')
+    model = fit_backend(backend, x_train, y_train, groups[train_inds], n_threads=n_threads, params=hyperparameters)
 
-    promotion_outcome, promotion_message = promotion_check(x_test, y_test, model)
+    test_clients = None if clients is None else np.asarray(clients)[test_inds]
+    promotion_outcome, promotion_message = promotion_check(x_test, y_test, model, clients=test_clients)
     print(promotion_message)
 
     if promotion_outcome == False:
@@ -204,5 +165,69 @@ def train_model(df: pd.DataFrame):
 
     return model
 
+def model_options(parameters: Dict) -> Dict:
+    return dict(backend=parameters.get('model_backend', GRADIENT_BOOSTING), n_threads=parameters.get('model_n_threads'))
 
+@profiled()
+@ignore_warnings
+def tune_model(df: pd.DataFrame, parameters: Dict = None) -> Dict:
+    '''
+    Returns the hyperparameters for train_model: the best config of a cross-validated search when the Kedro
+    parameters have a 'hyperparameter_search' entry, otherwise none, so the backend defaults are used.
+    With a 'feature_cache_dir' the feature matrix computed here is reused by train_model.
+    '''
+    parameters = parameters or {}
+    if not parameters.get('hyperparameter_search'):
+        return {}
+
+    log.info('Data Science - Starting Hyperparameter Search')
+    features, labels, groups = cached_features(
+        df, parameters.get('feature_cache_dir'), n_jobs=parameters.get('feature_n_jobs', 1)
+    )
+    hyperparameters = search_hyperparameters(features, labels, groups, parameters)
+    log.info('Data Science - Best Hyperparameters: ' + str(hyperparameters))
+
+    return hyperparameters
+
+@profiled()
+@ignore_warnings
+def train_model(df: pd.DataFrame, parameters: Dict = None, hyperparameters: Dict = None):
+    '''
+    Input a 'clean' data frame and output a trained model.
+    Reads 'feature_n_jobs' (worker processes for feature extraction, default 1), 'feature_cache_dir'
+    (where to cache the feature matrix between runs, off by default), 'model_backend' (default gradient_boosting)
+    and 'model_n_threads' (default all cores) from the Kedro parameters.
+    hyperparameters override the backend defaults, see tune_model.
+    '''
+    parameters = parameters or {}
+    log.info('Data Science - Starting Model Training')
+    features, labels, groups = cached_features(
+        df, parameters.get('feature_cache_dir'), n_jobs=parameters.get('feature_n_jobs', 1)
+    )
+    log.info('Data Science - Acquired Model Features')
+
+    return fit_model(
+        features, labels, groups, hyperparameters=hyperparameters, clients=df['lead.client_name'].to_numpy(),
+        **model_options(parameters)
+    )
+
+@profiled()
+@ignore_warnings
+def train_model_from_partitions(paths: List[str], parameters: Dict = None):
+    '''
+    Trains on the Parquet partitions written by preprocess_mumford_data_chunked.
+    Each partition holds whole candidate groups, so features are computed one partition at a time
+    and only the feature matrix of the full export is ever held in memory.
+    '''
+    parameters = parameters or {}
+    log.info('Data Science - Starting Model Training')
+    features, labels, groups = [], [], []
+    for path in paths:
+        df = pd.read_parquet(path, columns=INPUT_COLUMNS + ['decision'])
+        partition = cached_features(df, parameters.get('feature_cache_dir'), n_jobs=parameters.get('feature_n_jobs', 1))
+        features.append(partition[0])
+        labels.append(partition[1])
+        groups.append(partition[2])
+    log.info('Data Science - Acquired Model Features')
 
+    return fit_model(np.concatenate(features), np.concatenate(labels), np.concatenate(groups), **model_options(parameters))
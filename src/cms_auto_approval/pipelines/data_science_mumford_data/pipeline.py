@@ -1,14 +1,21 @@
 from kedro.pipeline import node, Pipeline
 from cms_auto_approval.pipelines.data_science_mumford_data.nodes import (
-    train_model
+    train_model,
+    tune_model
 )
 
 def create_pipeline(**kwargs):
     return Pipeline(
         [
+            node(
+                func=tune_model,
+                inputs=["primary_mumford_candidates_local", "parameters"],
+                outputs="model_hyperparameters",
+                name="tune_model"
+            ),
             node(
                 func=train_model,
-                inputs="primary_mumford_candidates_local",
+                inputs=["primary_mumford_candidates_local", "parameters", "model_hyperparameters"],
                 outputs="model_local",
                 name="train_model"
             )
@@ -0,0 +1,94 @@
+"""
+ONNX export of the trained model and batched scoring of candidate pairs with it.
+
+The model is exported with a dynamic batch dimension, so a whole batch of pairs is scored with one call
+to a single, reused onnxruntime.InferenceSession instead of one call per pair.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .features import FEATURE_COLUMNS, compute_feature_matrix
+
+log = logging.getLogger(__name__)
+
+# Pairs whose APPROVED probability reaches the threshold are auto-approved, the rest deferred to moderators.
+CONFIDENCE_THRESHOLD = 0.95
+APPROVED = 'APPROVED'
+DEFERRED = 'DEFERRED'
+
+# Rows per session call, bounds the memory of the runtime's intermediate tensors on very large batches.
+BATCH_SIZE = 65536
+INPUT_NAME = 'float_input'
+PROBABILITIES = 'probabilities'
+
+
+def decide(approval_probabilities: np.ndarray, threshold: float = CONFIDENCE_THRESHOLD) -> np.ndarray:
+    return np.where(approval_probabilities >= threshold, APPROVED, DEFERRED)
+
+
+def export_onnx(model) -> bytes:
+    """
+    Serializes a fitted classifier to ONNX, taking float32 batches of any size in FEATURE_COLUMNS order and
+    returning the class probabilities. The class order is kept in the 'classes' metadata of the model.
+    """
+    # skl2onnx is only needed when training.
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    initial_type = [(INPUT_NAME, FloatTensorType([None, len(FEATURE_COLUMNS)]))]
+    options = {id(model): {'zipmap': False}}  # probabilities as a tensor rather than a list of dicts
+    onx = convert_sklearn(model, initial_types=initial_type, options=options)
+
+    metadata = onx.metadata_props.add()
+    metadata.key, metadata.value = 'classes', ','.join(map(str, model.classes_))
+    return onx.SerializeToString()
+
+
+class OnnxScorer:
+    """
+    Scores candidate pairs with an exported model, from its path or serialized bytes.
+    The session is created once, keep the scorer around rather than creating one per request.
+    """
+
+    def __init__(self, model, threshold: float = CONFIDENCE_THRESHOLD, batch_size: int = BATCH_SIZE, n_threads: int = 0):
+        import onnxruntime as rt
+
+        options = rt.SessionOptions()
+        options.intra_op_num_threads = n_threads  # 0 lets the runtime pick
+        self._session = rt.InferenceSession(model, options, providers=['CPUExecutionProvider'])
+        self.threshold = threshold
+        self.batch_size = batch_size
+
+        # Models exported before the class metadata existed were fitted on the APPROVED / DEFERRED labels of data
+        # engineering. sklearn sorts its classes, so APPROVED is their first probability column.
+        classes = self._session.get_modelmeta().custom_metadata_map.get('classes', APPROVED)
+        self._approved = classes.split(',').index(APPROVED)
+
+    def approval_probabilities(self, features: np.ndarray) -> np.ndarray:
+        """
+        APPROVED probability of each row of a feature matrix in FEATURE_COLUMNS order.
+        """
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        probabilities = np.empty(len(features), dtype=np.float32)
+        for start in range(0, len(features), self.batch_size):
+            batch = features[start:start + self.batch_size]
+            probabilities[start:start + len(batch)] = self._session.run(
+                [PROBABILITIES], {INPUT_NAME: batch}
+            )[0][:, self._approved]
+        return probabilities
+
+    def decide(self, features: np.ndarray) -> np.ndarray:
+        return decide(self.approval_probabilities(features), self.threshold)
+
+    def score(self, pairs: pd.DataFrame) -> pd.DataFrame:
+        """
+        Featurizes pre-processed lead / candidate pairs and returns their APPROVED probability and decision,
+        indexed like the pairs. Group features are computed within the batch, so pass whole candidate groups.
+        """
+        probabilities = self.approval_probabilities(compute_feature_matrix(pairs))
+        return pd.DataFrame(
+            {'approval_probability': probabilities, 'decision': decide(probabilities, self.threshold)},
+            index=pairs.index,
+        )
@@ -0,0 +1,156 @@
+"""
+Hyperparameter search for the model backends, cross-validated with GroupKFold on the matching engine candidate id
+so that no candidate group is split between fitting and scoring.
+
+Trials run fold by fold in a process pool. After each fold the trials whose mean log loss so far is in the worse
+PRUNE_FRACTION are dropped, so most of the compute goes to the promising configs. The search only ever sees the
+training half of promotion_split, the promotion test half stays unseen until promotion_check.
+"""
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ...profiling import profiled
+from .features import FEATURE_COLUMNS
+from .models import GRADIENT_BOOSTING, HIST_GRADIENT_BOOSTING, fit_backend, promotion_split
+
+log = logging.getLogger(__name__)
+
+N_TRIALS = 20
+N_SPLITS = 5
+PRUNE_FRACTION = 0.5
+
+SEARCH_SPACES = {
+    GRADIENT_BOOSTING: {
+        'n_estimators': [50, 100, 200, 300],
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_depth': [3, 4, 5, 6, 7],
+        'min_samples_leaf': [20, 45, 100],
+        'min_samples_split': [50, 200, 500],
+        'max_features': [4, 7, 10, 14],
+        'subsample': [0.7, 0.8, 0.9, 1.0],
+    },
+    # The number of trees is picked by early stopping.
+    HIST_GRADIENT_BOOSTING: {
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_depth': [3, 5, 7, None],
+        'max_leaf_nodes': [15, 31, 63],
+        'min_samples_leaf': [20, 45, 100],
+        'l2_regularization': [0.0, 0.1, 1.0],
+    },
+}
+
+# Set in each worker by _init_worker: the memory-mapped training data shared by every trial.
+_data = {}
+
+
+def _init_worker(data_dir: str, n_splits: int):
+    from sklearn.model_selection import GroupKFold
+
+    features = np.load(os.path.join(data_dir, 'features.npy'), mmap_mode='r')
+    labels = np.load(os.path.join(data_dir, 'labels.npy'), mmap_mode='r')
+    groups = np.load(os.path.join(data_dir, 'groups.npy'), mmap_mode='r')
+    _data.update(
+        features=features, labels=labels, groups=groups,
+        folds=list(GroupKFold(n_splits=n_splits).split(features, groups=groups)),
+    )
+
+
+def _evaluate_fold(task: tuple) -> float:
+    from sklearn.metrics import log_loss
+
+    backend, params, fold = task
+    fit_inds, validation_inds = _data['folds'][fold]
+    x = pd.DataFrame(_data['features'][fit_inds], columns=FEATURE_COLUMNS)
+    model = fit_backend(backend, x, _data['labels'][fit_inds], _data['groups'][fit_inds], n_threads=1, params=params)
+    probabilities = model.predict_proba(pd.DataFrame(_data['features'][validation_inds], columns=FEATURE_COLUMNS))
+    return log_loss(_data['labels'][validation_inds], probabilities, labels=model.classes_)
+
+
+def sample_configs(backend: str, n_trials: int = N_TRIALS, seed: int = 0) -> List[Dict]:
+    """
+    The backend's default config followed by n_trials - 1 samples of its search space.
+    """
+    from sklearn.model_selection import ParameterSampler
+
+    samples = ParameterSampler(SEARCH_SPACES[backend], n_iter=max(n_trials - 1, 0), random_state=seed)
+    return [{}] + [dict(sample) for sample in samples]
+
+
+def search_configs(
+    features: np.ndarray,
+    labels: np.ndarray,
+    groups: np.ndarray,
+    configs: List[Dict],
+    backend: str = GRADIENT_BOOSTING,
+    n_splits: int = N_SPLITS,
+    prune_fraction: float = PRUNE_FRACTION,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
+    """
+    Cross-validates every config on the rows given and returns one row per trial with its config, the number of
+    folds it ran before being pruned and its mean validation log loss, best first. n_jobs=-1 uses every core.
+    """
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    losses = [[] for _ in configs]
+    alive = list(range(len(configs)))
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        # The workers memory-map one copy of the data instead of each unpickling their own.
+        for name, array in (('features', features), ('labels', labels), ('groups', groups)):
+            array = np.asarray(array)
+            np.save(os.path.join(data_dir, name + '.npy'), array.astype(str) if array.dtype == object else array)
+
+        pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(data_dir, n_splits)) if n_jobs > 1 else None
+        if pool is None:
+            _init_worker(data_dir, n_splits)
+        try:
+            for fold in range(n_splits):
+                tasks = [(backend, configs[trial], fold) for trial in alive]
+                for trial, loss in zip(alive, pool.map(_evaluate_fold, tasks) if pool else map(_evaluate_fold, tasks)):
+                    losses[trial].append(loss)
+
+                if fold < n_splits - 1 and prune_fraction:
+                    ranked = sorted(alive, key=lambda trial: np.mean(losses[trial]))
+                    alive = ranked[:max(1, int(np.ceil(len(ranked) * (1 - prune_fraction))))]
+                log.info('Data Science - Search fold ' + str(fold) + ': ' + str(len(alive)) + ' trials left')
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            _data.clear()
+
+    trials = pd.DataFrame({
+        'config': configs,
+        'folds': [len(trial_losses) for trial_losses in losses],
+        'log_loss': [np.mean(trial_losses) for trial_losses in losses],
+    })
+    return trials.sort_values(['folds', 'log_loss'], ascending=[False, True], ignore_index=True)
+
+
+@profiled()
+def search_hyperparameters(features: np.ndarray, labels: np.ndarray, groups: np.ndarray, parameters: Dict = None) -> Dict:
+    """
+    Searches hyperparameters on the training half of promotion_split and returns the best config.
+    Reads 'model_backend' and 'hyperparameter_search' (n_trials, n_splits, prune_fraction, n_jobs, seed).
+    """
+    parameters = parameters or {}
+    # 'hyperparameter_search: true' searches with the default options.
+    options = parameters.get('hyperparameter_search')
+    options = options if isinstance(options, dict) else {}
+    backend = parameters.get('model_backend', GRADIENT_BOOSTING)
+
+    train_inds, _ = promotion_split(groups)
+    configs = sample_configs(backend, n_trials=options.get('n_trials', N_TRIALS), seed=options.get('seed', 0))
+    trials = search_configs(
+        features[train_inds], labels[train_inds], groups[train_inds], configs, backend=backend,
+        n_splits=options.get('n_splits', N_SPLITS), prune_fraction=options.get('prune_fraction', PRUNE_FRACTION),
+        n_jobs=options.get('n_jobs', 1),
+    )
+    log.info('Data Science - Hyperparameter search trials:\n' + trials.to_string())
+
+    return trials['config'][0]
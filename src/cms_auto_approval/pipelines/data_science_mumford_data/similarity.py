@@ -0,0 +1,112 @@
+"""
+Token-ID encoding of the product texts and the batched set-similarity kernel used by the feature engine.
+Each distinct text is split once and stored as a sorted array of unique integer token IDs (CSR layout),
+so the jaccard scores of all pairs are computed with array operations instead of Python sets.
+"""
+from itertools import chain
+from typing import List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+MAXIMUM_WORDS = 100
+BATCH_SIZE = 250000
+SEPARATOR = '\x01'
+
+# JACCARD_SCORES[intersection, union] == round(intersection / union, 2), an empty union scores 0.
+JACCARD_SCORES = np.array(
+    [[round(i / u, 2) if u else 0 for u in range(2 * MAXIMUM_WORDS + 1)] for i in range(MAXIMUM_WORDS + 1)]
+)
+
+
+class TokenizedText(NamedTuple):
+    # Row codes of each tokenized column into the distinct texts, missing text is the last distinct text.
+    codes: List[np.ndarray]
+    # Word counts of the distinct texts, as .astype(str).str.split().str.len() gives them.
+    word_counts: np.ndarray
+    # Token IDs of distinct text i are token_ids[indptr[i]:indptr[i + 1]], sorted and unique.
+    indptr: np.ndarray
+    token_ids: np.ndarray
+    vocabulary_size: int
+
+
+def _split_texts(texts: list) -> tuple:
+    # Splits every text with a single str.split call, using a separator word to recover the text boundaries.
+    # Returns the words and the index of the text each word came from.
+    words = np.array((' ' + SEPARATOR + ' ').join(texts).split(), dtype=object)
+    is_separator = words == SEPARATOR
+    if is_separator.sum() != len(texts) - 1:
+        # A text contains the separator itself, fall back to splitting the texts one at a time.
+        split = [text.split() for text in texts]
+        lengths = np.fromiter(map(len, split), dtype=np.int64, count=len(split))
+        return np.array(list(chain.from_iterable(split)), dtype=object), np.repeat(np.arange(len(texts)), lengths)
+    return words[~is_separator], np.cumsum(is_separator)[~is_separator]
+
+def tokenize(*columns: pd.Series) -> TokenizedText:
+    """
+    Tokenizes the distinct texts of the given columns once, against one shared vocabulary so that their
+    token IDs can be compared. Like jaccard_similarity, only the first MAXIMUM_WORDS words are kept and
+    text that is not a string has no tokens.
+    """
+    codes, uniques = pd.factorize(pd.concat(columns, ignore_index=True))
+    # Missing text is appended as the last distinct text.
+    is_text = np.fromiter((isinstance(text, str) for text in uniques), dtype=bool, count=len(uniques))
+    texts = [text if is_text[i] else '' for i, text in enumerate(uniques)] + ['']
+
+    words, text_index = _split_texts(texts)
+    token_ids, vocabulary = pd.factorize(words)
+    vocabulary_size = max(len(vocabulary), 1)
+
+    word_counts = np.bincount(text_index, minlength=len(texts))
+    position = np.arange(len(words)) - (np.cumsum(word_counts) - word_counts)[text_index]
+    kept = position < MAXIMUM_WORDS
+
+    # Sorting (text, token) keys groups the tokens by text, orders them within it and drops repeated words.
+    keys = np.unique(text_index[kept] * vocabulary_size + token_ids[kept])
+    indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // vocabulary_size, minlength=len(texts)), out=indptr[1:])
+
+    # Word counts as .astype(str).str.split().str.len() gives them, missing text becomes the single word 'nan'.
+    word_counts[-1] = 1
+    for i in np.flatnonzero(~is_text):
+        word_counts[i] = len(str(uniques[i]).split())
+
+    codes[codes == -1] = len(texts) - 1
+    splits = np.cumsum([len(column) for column in columns])[:-1]
+    return TokenizedText(
+        codes=np.split(codes, splits),
+        word_counts=word_counts,
+        indptr=indptr,
+        token_ids=(keys % vocabulary_size).astype(np.int32),
+        vocabulary_size=vocabulary_size,
+    )
+
+
+def _pair_keys(tokens: TokenizedText, texts: np.ndarray) -> np.ndarray:
+    # Token IDs of each text offset by its position in the batch, so one sort can compare every pair at once.
+    starts = tokens.indptr[texts]
+    lengths = tokens.indptr[texts + 1] - starts
+    batch_position = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return batch_position * tokens.vocabulary_size + tokens.token_ids[np.repeat(starts, lengths) + offsets]
+
+
+def jaccard_scores(tokens: TokenizedText, texts_a: np.ndarray, texts_b: np.ndarray) -> np.ndarray:
+    """
+    Batched jaccard_similarity between the distinct texts texts_a[i] and texts_b[i] of a tokenization.
+    Pairs are processed in batches of BATCH_SIZE to bound the memory of the expanded token arrays.
+    """
+    sizes = np.diff(tokens.indptr)
+    scores = np.empty(len(texts_a), dtype=np.float64)
+    for start in range(0, len(texts_a), BATCH_SIZE):
+        a = texts_a[start:start + BATCH_SIZE]
+        b = texts_b[start:start + BATCH_SIZE]
+
+        # Both halves are already sorted, so the stable sort only has to merge two runs.
+        # A key appearing twice is a token shared by the pair.
+        keys = np.sort(np.concatenate([_pair_keys(tokens, a), _pair_keys(tokens, b)]), kind='stable')
+        shared = keys[1:][keys[1:] == keys[:-1]] // tokens.vocabulary_size
+        intersection = np.bincount(shared, minlength=len(a))
+
+        scores[start:start + len(a)] = JACCARD_SCORES[intersection, sizes[a] + sizes[b] - intersection]
+    return scores
@@ -0,0 +1,249 @@
+"""
+Timing and memory instrumentation of the pipeline steps.
+
+A Profiler records one structured record per step: wall and CPU seconds, the resident memory at the start and
+the peak during the step, and the rows going in and out. Steps nest, a record's name is the path of the steps
+it ran in, e.g. 'preprocess_mumford_data/preprocess_pairs'. Steps are recorded while a profiler is active:
+
+    with Profiler().activate() as profiler:     # or the profile_run decorator, or ProfilingHooks under Kedro
+        ...
+    profiler.metrics()                           # flat {'<step>.<measure>': value} for the experiment tracker
+
+Functions decorated with @profiled() are steps, and do nothing extra when no profiler is active.
+With a profile_dir the outermost steps also run under cProfile, one <step>.prof file each.
+"""
+import cProfile
+import functools
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.01
+PROFILE_DIR_VARIABLE = 'CMS_AUTO_APPROVAL_PROFILE_DIR'
+MEASURES = ['wall_seconds', 'cpu_seconds', 'start_rss_mb', 'peak_rss_mb', 'rows_in', 'rows_out']
+
+_active = threading.local()
+
+
+def current_rss_mb() -> float:
+    """
+    Resident memory of this process. Falls back to the peak so far where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        # ru_maxrss is in kB on Linux, bytes on macOS.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+class _PeakRss:
+    # Samples the resident memory on a background thread, as the process' own peak only ever grows.
+    def __init__(self):
+        self.peak = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+
+def count_rows(value) -> int:
+    """
+    Rows of a data frame or array, or of the first element of a tuple of them. None for anything else.
+    """
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(value)
+    return None
+
+
+class Profiler:
+
+    def __init__(self, profile_dir: str = None):
+        self.profile_dir = profile_dir
+        self.records: List[Dict] = []
+        # Steps nest per thread, e.g. the nodes that Kedro's ThreadRunner runs side by side.
+        self._local = threading.local()
+
+    @property
+    def _stack(self) -> List[str]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def activate(self):
+        previous = getattr(_active, 'profiler', None)
+        _active.profiler = self
+        try:
+            yield self
+        finally:
+            _active.profiler = previous
+
+    @contextmanager
+    def step(self, name: str, rows_in: int = None):
+        """
+        Records the enclosed block as a step. Yields its record, set record['rows_out'] from within if known.
+        """
+        # The stack of the thread the step starts on, which is left when it ends on another, e.g. on an error.
+        stack = self._stack
+        stack.append(name)
+        record = {'step': '/'.join(stack), 'rows_in': rows_in, 'rows_out': None}
+        # Listed when the step starts, so that a parent comes before its sub-steps.
+        self.records.append(record)
+        profile = cProfile.Profile() if self.profile_dir and len(stack) == 1 else None
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        record['start_rss_mb'] = current_rss_mb()
+        try:
+            with _PeakRss() as rss:
+                if profile:
+                    profile.enable()
+                try:
+                    yield record
+                finally:
+                    if profile:
+                        profile.disable()
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall
+            record['cpu_seconds'] = time.process_time() - cpu
+            record['peak_rss_mb'] = rss.peak
+            stack.pop()
+            if profile:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profile.dump_stats(os.path.join(self.profile_dir, record['step'].replace('/', '.') + '.prof'))
+            log.info('Profiling - ' + json.dumps(record))
+
+    def current_step(self) -> str:
+        return self._stack[-1] if self._stack else None
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records, columns=['step'] + MEASURES)
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        The records flattened into '<step>.<measure>' keys, e.g. to pass to _track_experiment_results.
+        """
+        return {
+            record['step'] + '.' + measure: record[measure]
+            for record in self.records for measure in MEASURES if record[measure] is not None
+        }
+
+
+def active_profiler() -> Profiler:
+    return getattr(_active, 'profiler', None)
+
+
+def profiled(name: str = None) -> Callable:
+    """
+    Records every call of the decorated function as a step of the active profiler, with the rows of its
+    first argument and of its result.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = active_profiler()
+            # Kedro nodes are already recorded by ProfilingHooks under the same name.
+            if profiler is None or profiler.current_step() == (name or func.__name__):
+                return func(*args, **kwargs)
+            with profiler.step(name or func.__name__, rows_in=count_rows(args[0]) if args else None) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = count_rows(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def profile_run(func: Callable) -> Callable:
+    """
+    Profiles a whole run, e.g. a Flyte task, as one step with its decorated sub-steps nested under it, and logs
+    a summary table at the end. cProfile files are written to $CMS_AUTO_APPROVAL_PROFILE_DIR when it is set.
+    Put it under @task so Flyte still sees the function's signature.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with Profiler(profile_dir=os.environ.get(PROFILE_DIR_VARIABLE)).activate() as profiler:
+            try:
+                return profiled(func.__name__)(func)(*args, **kwargs)
+            finally:
+                log.info('Profiling - Summary\n' + profiler.to_frame().to_string(index=False))
+    return wrapper
+
+
+def _total_rows(values: Dict) -> Optional[int]:
+    rows = [count_rows(value) for value in values.values()]
+    rows = [n for n in rows if n is not None]
+    return sum(rows) if rows else None
+
+
+class RunProfiler:
+    """
+    Profiles a pipeline run node by node, the Kedro free part of hooks.ProfilingHooks, whose hooks call these
+    methods. node is anything with a name. Nodes in flight are keyed on their name and thread, so that the
+    nodes of a ThreadRunner each close their own step.
+    """
+
+    def __init__(self):
+        self.profiler = None
+        self._activation = None
+        self._steps = {}
+
+    def before_pipeline_run(self) -> None:
+        self.profiler = Profiler(profile_dir=os.environ.get(PROFILE_DIR_VARIABLE))
+        self._activation = self.profiler.activate()
+        self._activation.__enter__()
+
+    def before_node_run(self, node, inputs: Dict) -> None:
+        step = self.profiler.step(node.name, rows_in=_total_rows(inputs))
+        self._steps[node.name, threading.get_ident()] = (step, step.__enter__())
+
+    def after_node_run(self, node, outputs: Dict) -> None:
+        step, record = self._steps.pop((node.name, threading.get_ident()))
+        record['rows_out'] = _total_rows(outputs)
+        step.__exit__(None, None, None)
+
+    def on_node_error(self, error: Exception, node) -> None:
+        key = (node.name, threading.get_ident())
+        if key in self._steps:
+            step, _ = self._steps.pop(key)
+            step.__exit__(type(error), error, error.__traceback__)
+
+    def after_pipeline_run(self) -> None:
+        self._finish('Profiling - Summary')
+
+    def on_pipeline_error(self, error: Exception) -> None:
+        # after_pipeline_run does not run after a failure. The steps of the nodes that were still running are
+        # closed, latest first, so the profiler is not left active for the rest of the process.
+        for step, _ in reversed(list(self._steps.values())):
+            step.__exit__(type(error), error, error.__traceback__)
+        self._steps.clear()
+        self._finish('Profiling - Summary of the failed run')
+
+    def _finish(self, title: str) -> None:
+        if self._activation is None:
+            return
+        log.info(title + '\n' + self.profiler.to_frame().to_string(index=False))
+        self._activation.__exit__(None, None, None)
+        self._activation = None
@@ -1,28 +1,53 @@
 from flytekit import task
-import boto3
-from skl2onnx import convert_sklearn
-from pathlib import Path
-import pandas as pd
-import pickle
-from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
-from src.cms_auto_approval.pipelines.data_science_mumford_data.nodes import train_model
+import tempfile
+from src.cms_auto_approval.profiling import profile_run
+
+DELTA_KEY = "pipelines/auto-decisions/deltas/{date}.csv"
+HISTORY = "s3://bv-ml-ops/pipelines/auto-decisions/history"
 
 @task
-def run_package():
+@profile_run
+def run_package(streaming: bool = False, delta_date: str = "", chunk_size: int = 100000):
+    """
+    With streaming=True the export is read and pre-processed in chunks, spilling to local Parquet partitions,
+    so memory is bounded by the chunk / partition size rather than the size of the export. chunk_size sets both,
+    in rows: the export is read chunk_size rows at a time and paired in partitions of at most chunk_size products.
+    With a delta_date (YYYY-MM-DD) only that day's decisions are read and processed, and the model is trained on
+    them together with the featurized history of earlier days, see incremental.py.
+    """
+    # Imported when the task runs rather than when it is registered or its container starts, boto3 and the
+    # pipelines (sklearn, skl2onnx) take most of the start-up time otherwise.
+    import boto3
+    import pandas as pd
+    from src.cms_auto_approval.incremental import train_model_incremental
+    from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+    from src.cms_auto_approval.pipelines.data_engineering_mumford_data.streaming import preprocess_mumford_data_chunked, read_export_chunks
+    from src.cms_auto_approval.pipelines.data_science_mumford_data.nodes import train_model, train_model_from_partitions
+    from src.cms_auto_approval.pipelines.data_science_mumford_data.scoring import export_onnx
 
     # read training dataset from S3
     s3_client = boto3.client("s3")
-    obj = s3_client.get_object(Bucket= "bv-ml-ops", Key= "pipelines/auto-decisions/200000.csv") 
-    df = pd.read_csv(obj['Body'])
+    key = DELTA_KEY.format(date=delta_date) if delta_date else "pipelines/auto-decisions/200000.csv"
+    obj = s3_client.get_object(Bucket= "bv-ml-ops", Key= key)
+
+    if delta_date:
+        model = train_model_incremental(pd.read_csv(obj['Body']), delta_date, HISTORY)
+    elif streaming:
+        with tempfile.TemporaryDirectory() as spill_dir:
+            partitions = preprocess_mumford_data_chunked(
+                read_export_chunks(obj['Body'], chunk_size), spill_dir, partition_rows=chunk_size,
+            )
+            model = train_model_from_partitions(partitions)
+    else:
+        df = pd.read_csv(obj['Body'])
 
-    # pre-process data and train model
-    pre_pro_df = preprocess_mumford_data(df)
-    model = train_model(pre_pro_df)
+        # pre-process data and train model
+        pre_pro_df = preprocess_mumford_data(df)
+        model = train_model(pre_pro_df)
 
     # save model to S3
     s3_resource = boto3.resource("s3")
-    #pickle_obj = pickle.dumps(model)
-    onnx_model = convert_sklearn(model)
+    onnx_model = export_onnx(model)
     s3_resource.Object("bv-ml-ops","pipelines/auto-decisions/model.onnx").put(Body=onnx_model)
 
     return model
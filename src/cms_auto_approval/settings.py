@@ -1,6 +1,6 @@
 
 """Project settings."""
-from cms_auto_approval.hooks import ProjectHooks
+from cms_auto_approval.hooks import ProfilingHooks, ProjectHooks
 
 # Instantiate and list your project hooks here
-HOOKS = (ProjectHooks(),)
+HOOKS = (ProjectHooks(), ProfilingHooks())
@@ -1,5 +1,2 @@
-from src.cms_auto_approval.run import run_package
-
 def get_hello_message() -> str:
-    run_package
-    return "done"
\ No newline at end of file
+    return "done"
@@ -1,13 +1,16 @@
+from functools import partial
+
 import pandas as pd
 from flytekit import HashMethod
-from hashable_df import hashable_df
 from typing_extensions import Annotated
 
+from src.cms_auto_approval.hashing import SAMPLED, hash_dataframe
+
 
 def _hash_pandas_dataframe_function(df: pd.DataFrame) -> str:
-    # We use hashable_df here to deal with lists in the dataframe to be hashed
-    # Otherwise it throws an error stating "TypeError: unhashable type: 'list'"
-    return str(pd.util.hash_pandas_object(hashable_df(df)))
+    # Folds per-column hashes into one short digest. List cells (e.g. mpns) are joined into strings
+    # column by column, rather than converting the whole frame up front.
+    return hash_dataframe(df)
 
 """
 Use this type if you are returning pandas data frames and want the results to be cached.
@@ -23,3 +26,11 @@ def my_task() -> CachedDataFrame:
 CachedDataFrame = Annotated[
     pd.DataFrame, HashMethod(_hash_pandas_dataframe_function)  # noqa: F821
 ]
+
+"""
+Like CachedDataFrame, but only hashes an evenly spaced sample of the rows (plus the shape, columns and dtypes).
+Much cheaper on large frames, at the cost of missing changes that fall between the sampled rows.
+"""
+SampledCachedDataFrame = Annotated[
+    pd.DataFrame, HashMethod(partial(hash_dataframe, mode=SAMPLED))  # noqa: F821
+]
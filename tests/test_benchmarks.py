@@ -0,0 +1,52 @@
+import pandas as pd
+
+from benchmarks.bench_import_time import import_time
+from benchmarks.suite import compare
+from benchmarks.synthetic import iter_mumford_export, make_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+
+
+def test_export_shape_and_decision_mix():
+    df = make_mumford_export(10000)
+    assert len(df) == 10000
+    assert (df.groupby('matching_engine_candidate_id')['member_type'].first() == 'lead').all()
+
+    mix = df['decision'].value_counts(normalize=True)
+    assert 0.01 < mix['ERRORED'] < 0.03
+    assert 0.3 < mix['REJECTED'] < 0.5
+    assert df['attrs'].str.contains('MANUFACTURER_PART_NUMBER=').any()
+    assert df['attrs'].str.contains('MODEL_NUMBER=').any()
+
+    pairs = preprocess_mumford_data(df)
+    assert set(pairs['decision']) == {'APPROVED', 'DEFERRED'}
+
+
+def test_chunks_hold_whole_groups_and_are_reproducible():
+    chunks = list(iter_mumford_export(1003, chunk_size=251))
+    assert sum(len(chunk) for chunk in chunks) == 1003
+    assert all(chunk['member_type'].iloc[0] == 'lead' for chunk in chunks)
+    df = pd.concat(chunks)
+    assert df.index.is_unique and df['matching_engine_candidate_id'].is_monotonic_increasing
+
+    again = next(iter_mumford_export(1003, chunk_size=251))
+    pd.testing.assert_frame_equal(again, chunks[0])
+
+
+def test_compare_flags_regressions_against_recent_history():
+    history = pd.DataFrame({
+        'host': 'a', 'rows': 1000, 'step': ['x'] * 6 + ['y'],
+        'seconds': [10.0, 1.0, 1.0, 1.1, 0.9, 1.0, 1.0],
+    })
+    results = pd.DataFrame({'host': 'a', 'rows': 1000, 'step': ['x', 'y', 'z'], 'seconds': [1.5, 1.1, 9.0]})
+
+    compared = compare(results, history).set_index('step')
+    # The old 10s run is outside the window of the last five.
+    assert compared.loc['x', 'baseline'] == 1.0
+    assert compared['regression'].tolist() == [True, False, False]
+    assert pd.isna(compared.loc['z', 'baseline'])
+
+
+def test_task_modules_import_without_heavy_dependencies():
+    for module in ["src.tasks.hello", "src.cms_auto_approval.run"]:
+        _, heavy = import_time(module, repeat=1)
+        assert heavy == []
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from benchmarks.synthetic import make_attrs, make_mumford_export
+from src.cms_auto_approval.extras.datasets.parquet_partitions import read_partitions, write_partitions
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import (
+    CANDIDATE_COLUMNS,
+    LEAD_COLUMNS,
+    convert_not_a_number_values,
+    create_lead_candidate_rows,
+    extract_attribute_identifiers,
+    extract_attribute_lists,
+    get_clean_model_nos,
+    get_clean_mpns,
+    lowercase_text,
+    normalize_text,
+    preprocess_mumford_data,
+    preprocess_products,
+    remove_punctuation,
+)
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.streaming import pack_buckets, preprocess_mumford_data_chunked
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import clean_mpn, identifiers
+
+ATTRS = [
+    "{MANUFACTURER_PART_NUMBER=[AB-1234, AB1234], MODEL_NUMBER=[X100]}",
+    "{INVALID_MANUFACTURER_PART_NUMBER=[zz-1], BRAND=[acme], MANUFACTURER_PART_NUMBER=[qq 12]}",
+    "{INVALID_MODEL_NUMBER=[bad], MODEL_NUMBER=[good]}",
+    "{BRAND=[MODEL_NUMBER lookalike]}",
+    # Only the MPN extraction renames the invalid key, model numbers keep it as it is.
+    "{MODEL_NUMBER=[INVALID_MANUFACTURER_PART_NUMBER-7 x]}",
+    "{INVALID_MANUFACTURER_PART_NUMBER_MODEL_NUMBER=[q1], MANUFACTURER_PART_NUMBER=[INVALID_MANUFACTURER_PART_NUMBER]}",
+    "{BRAND=[acme]}",
+    "{}",
+]
+
+
+def test_extract_attribute_lists_matches_row_wise_functions():
+    df = pd.DataFrame({"attrs": ATTRS + list(make_attrs(2000))})
+
+    extracted = extract_attribute_lists(df["attrs"])
+
+    assert extracted["mpns"].tolist() == df.apply(get_clean_mpns, axis=1).tolist()
+    assert extracted["model_nos"].tolist() == df.apply(get_clean_model_nos, axis=1).tolist()
+
+
+def test_extract_attribute_lists_keeps_index_and_defaults_missing_attrs():
+    attrs = pd.Series([ATTRS[1], None], index=[10, 3])
+
+    extracted = extract_attribute_lists(attrs, keys={"brand": "BRAND"})
+
+    assert extracted.index.tolist() == [10, 3]
+    assert extracted["brand"].tolist() == ["[acme]", "[]"]
+
+
+def test_identifier_lists_match_cleaned_strings():
+    attrs = pd.Series(ATTRS + list(make_attrs(2000)))
+
+    strings = extract_attribute_lists(attrs)
+    lists = extract_attribute_identifiers(attrs)
+
+    for column in ["mpns", "model_nos"]:
+        assert [identifiers(v) for v in lists[column]] == [clean_mpn(v) for v in strings[column]]
+        # CSV round trips of the list columns come back as strings
+        assert [identifiers(str(v)) for v in lists[column]] == [clean_mpn(v) for v in strings[column]]
+
+
+def test_normalize_text_matches_separate_steps():
+    pairs = preprocess_mumford_data(make_mumford_export(2000)).head(100)
+    columns = ["lead.name", "other.name", "lead.description", "other.description"]
+    raw = pd.DataFrame({
+        column: ["A-b, C!", np.nan, None, 5, "\u00dcn\u00ef-CODE", "  x_y  ", 2.5, pd.NA, "kit"] for column in columns
+    })
+    raw = pd.concat([raw, pairs[columns]], ignore_index=True)
+
+    expected = lowercase_text(remove_punctuation(convert_not_a_number_values(raw.copy())))
+    normalized = normalize_text(raw.copy())
+
+    pd.testing.assert_frame_equal(normalized, expected)
+
+
+def test_lead_candidate_rows_match_merge_on_group():
+    products = preprocess_products(make_mumford_export(3000))
+    # Groups with two leads, without a lead, missing group ids and a missing member type.
+    products.iloc[::7, products.columns.get_loc("member_type")] = "lead"
+    products.iloc[5:10, products.columns.get_loc("member_type")] = "candidate"
+    products.iloc[20:25, products.columns.get_loc("matching_engine_candidate_id")] = np.nan
+    products.iloc[30, products.columns.get_loc("member_type")] = np.nan
+    products = products.sample(frac=1, random_state=1)
+
+    candidates = products[products["member_type"] != "lead"]
+    leads = products[products["member_type"] == "lead"]
+    leads = leads[["matching_engine_candidate_id"] + list(LEAD_COLUMNS)].rename(columns=LEAD_COLUMNS)
+    candidates = candidates[list(CANDIDATE_COLUMNS)].rename(columns=CANDIDATE_COLUMNS)
+    expected = pd.merge(candidates, leads, on="matching_engine_candidate_id", how="inner")
+
+    pairs = create_lead_candidate_rows(products)
+
+    assert pairs.columns.tolist() == list(CANDIDATE_COLUMNS.values()) + list(LEAD_COLUMNS.values())
+    pd.testing.assert_frame_equal(pairs, expected[pairs.columns])
+
+
+def test_chunked_preprocessing_matches_full_frame(tmp_path):
+    export = make_mumford_export(3000)
+    # Candidate groups are split across chunks.
+    chunks = [export.iloc[start:start + 700] for start in range(0, len(export), 700)]
+
+    paths = preprocess_mumford_data_chunked(chunks, str(tmp_path), partition_rows=800)
+
+    chunked = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+    full = preprocess_mumford_data(export.copy())
+    key = ["matching_engine_candidate_id", "other.name", "confidence"]
+    chunked = chunked.sort_values(key).reset_index(drop=True)
+    full = full.sort_values(key).reset_index(drop=True)
+
+    # About 2,940 products after dropping the errored rows, in partitions of at most 800.
+    assert len(paths) == 4
+    assert all(len(pd.read_parquet(path)) <= 800 for path in paths)
+    assert chunked.columns.tolist() == full.columns.tolist()
+    for column in full.columns:
+        assert [list(v) if isinstance(v, np.ndarray) else v for v in chunked[column]] == full[column].tolist(), column
+
+
+def test_buckets_pack_into_partitions_under_the_bound():
+    assert pack_buckets(np.array([3, 0, 4, 2, 5, 9, 1, 0]), 6) == [(0, 2), (2, 4), (4, 5), (5, 6), (6, 8)]
+    assert pack_buckets(np.zeros(4, dtype=int), 6) == []
+
+    bucket_rows = np.random.default_rng(0).poisson(3, 2 ** 16)
+    for partition_rows in (1000, 10000):
+        ranges = pack_buckets(bucket_rows, partition_rows)
+        sizes = [bucket_rows[start:stop].sum() for start, stop in ranges]
+        assert max(sizes) <= partition_rows
+        assert len(ranges) <= 2 * np.ceil(bucket_rows.sum() / partition_rows)
+        assert ranges[0][0] == 0 and all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_partitioned_parquet_round_trip_keeps_groups_and_list_types(tmp_path):
+    pairs = preprocess_mumford_data(make_mumford_export(1000))
+    pairs["lead.mpns"] = [[] for _ in range(len(pairs))]
+
+    paths = write_partitions(pairs, str(tmp_path / "pairs"), n_partitions=3)
+
+    assert len(paths) == 3
+    for path in paths:
+        assert pq.read_schema(path).field("lead.mpns").type == pa.list_(pa.string())
+    groups = [set(pd.read_parquet(path)["matching_engine_candidate_id"]) for path in paths]
+    assert not groups[0] & groups[1] and not groups[1] & groups[2] and not groups[0] & groups[2]
+
+    loaded = read_partitions(str(tmp_path / "pairs"), columns=["decision", "other.model_nos"])
+    assert loaded.columns.tolist() == ["decision", "other.model_nos"]
+    assert len(loaded) == len(pairs)
+
+
+def test_writing_partitions_again_replaces_the_earlier_ones(tmp_path):
+    pairs = preprocess_mumford_data(make_mumford_export(2000))
+    write_partitions(pairs, str(tmp_path / "pairs"))
+
+    write_partitions(pairs.head(10), str(tmp_path / "pairs"))
+    pd.testing.assert_frame_equal(
+        read_partitions(str(tmp_path / "pairs")).sort_values(["matching_engine_candidate_id", "other.external_id"], ignore_index=True),
+        pairs.head(10).sort_values(["matching_engine_candidate_id", "other.external_id"], ignore_index=True),
+        check_dtype=False,
+    )
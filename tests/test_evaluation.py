@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.metrics import classification_report, log_loss, precision_score, recall_score
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data.evaluation import (
+    evaluate,
+    precision_coverage_curve,
+    recommend_threshold,
+)
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import FEATURE_COLUMNS, compute_feature_matrix
+from src.cms_auto_approval.pipelines.data_science_mumford_data.nodes import promotion_check
+
+
+class CountingModel:
+    def __init__(self, model):
+        self.model, self.classes_, self.calls = model, model.classes_, 0
+
+    def predict_proba(self, x):
+        self.calls += 1
+        return self.model.predict_proba(x)
+
+
+def test_evaluation_scores_once_and_matches_sklearn_metrics():
+    pairs = preprocess_mumford_data(make_mumford_export(3000))
+    x = pd.DataFrame(compute_feature_matrix(pairs), columns=FEATURE_COLUMNS)
+    y = pairs["decision"].to_numpy()
+    fitted = GradientBoostingClassifier(n_estimators=20, random_state=0).fit(x[:1500], y[:1500])
+    model = CountingModel(fitted)
+    x_test, y_test, clients = x[1500:], y[1500:], pairs["lead.client_name"].to_numpy()[1500:]
+
+    evaluation = evaluate(model, x_test, y_test, clients=clients)
+
+    assert model.calls == 1
+    probabilities = fitted.predict_proba(x_test)
+    assert evaluation.log_loss == log_loss(y_test, probabilities)
+    assert evaluation.report == classification_report(y_test, fitted.predict(x_test), digits=4)
+    for _, row in evaluation.sweep.iterrows():
+        decided = np.where(probabilities[:, 0] >= row["threshold"], "APPROVED", "DEFERRED")
+        assert np.isclose(row["precision"], precision_score(y_test, decided, pos_label="APPROVED", zero_division=0))
+        assert np.isclose(row["recall"], recall_score(y_test, decided, pos_label="APPROVED"))
+        assert row["approved"] == (decided == "APPROVED").sum()
+
+    assert evaluation.clients["pairs"].sum() == len(y_test)
+    assert set(evaluation.clients["client"]) == set(clients)
+
+
+def test_precision_coverage_curve_and_recommendation():
+    rng = np.random.default_rng(0)
+    # Rounded so that many pairs share a probability.
+    probabilities = rng.random(2000).round(2)
+    is_approved = rng.random(2000) < probabilities
+
+    curve = precision_coverage_curve(probabilities, is_approved, precision_modifier=0.015)
+
+    assert list(curve["threshold"]) == sorted(set(probabilities), reverse=True)
+    for _, row in curve.sample(20, random_state=0).iterrows():
+        approved = probabilities >= row["threshold"]
+        assert row["approved"] == approved.sum()
+        assert np.isclose(row["precision"], is_approved[approved].mean())
+        assert np.isclose(row["calibrated_precision"], is_approved[approved].mean() + 0.015)
+
+    recommended = recommend_threshold(curve, target_precision=0.9)
+    passing = [t for t in set(probabilities) if is_approved[probabilities >= t].mean() + 0.015 >= 0.9]
+    assert recommended["threshold"] == min(passing)
+    assert recommend_threshold(curve, target_precision=1.1) is None
+
+
+def test_promotion_check_without_a_recommended_threshold():
+    class CoinFlip:
+        classes_ = np.array(["APPROVED", "DEFERRED"])
+
+        def predict_proba(self, x):
+            return np.full((len(x), 2), 0.5)
+
+    x_test = pd.DataFrame(np.zeros((4, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    y_test = np.array(["APPROVED", "DEFERRED"] * 2)
+    assert evaluate(CoinFlip(), x_test, y_test).recommendation is None
+
+    passed, message = promotion_check(x_test, y_test, CoinFlip())
+    assert not passed and "Log loss" in message
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data import feature_cache
+from src.cms_auto_approval.pipelines.data_science_mumford_data.feature_cache import cached_features, data_fingerprint
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import (
+    FEATURE_COLUMNS,
+    compute_feature_matrix,
+    compute_feature_matrix_parallel,
+    is_string_like_product_code,
+    mpn_match_scores,
+    per_distinct_pair,
+    product_code_in_pair,
+    product_codes,
+)
+from src.cms_auto_approval.pipelines.data_science_mumford_data.groups import STATISTICS, GroupIndex
+from src.cms_auto_approval.pipelines.data_science_mumford_data.nodes import (
+    get_features_row_wise,
+    is_product_code_in_pair,
+    jaccard_similarity,
+    mpn_match,
+)
+from src.cms_auto_approval.pipelines.data_science_mumford_data.similarity import jaccard_scores, tokenize
+
+
+def _pairs(n_rows=3000) -> pd.DataFrame:
+    df = preprocess_mumford_data(make_mumford_export(n_rows))
+    # Edge cases the row-wise functions handle defensively.
+    df.iloc[0, df.columns.get_loc("lead.name")] = np.nan
+    df.iloc[1, df.columns.get_loc("other.description")] = np.nan
+    df.iloc[2, df.columns.get_loc("other.name")] = ""
+    df.iloc[3, df.columns.get_loc("lead.name")] = "ab12 x9 kit"
+    df.iloc[3, df.columns.get_loc("other.name")] = "the x9 kit"
+    return df.reset_index(drop=True)
+
+
+def test_feature_matrix_matches_row_wise_features():
+    df = _pairs()
+
+    expected = get_features_row_wise(df.copy())[FEATURE_COLUMNS].astype(np.float32)
+    features = compute_feature_matrix(df)
+
+    assert features.dtype == np.float32
+    assert features.shape == (len(df), len(FEATURE_COLUMNS))
+    for i, column in enumerate(FEATURE_COLUMNS):
+        np.testing.assert_allclose(features[:, i], expected[column].to_numpy(), atol=1e-6, err_msg=column)
+
+
+def test_parallel_feature_matrix_matches_serial():
+    df = _pairs(1000)
+    # Shuffle so that the candidate groups are interleaved across the frame.
+    df = df.sample(frac=1, random_state=0)
+
+    np.testing.assert_array_equal(compute_feature_matrix_parallel(df, n_jobs=3), compute_feature_matrix(df))
+
+
+def test_jaccard_scores_match_row_wise_on_edge_cases():
+    long_text = " ".join(str(i) for i in range(150))
+    df = pd.DataFrame({
+        "a": ["a a b", long_text, long_text, "x \x01 y", np.nan, "", 12, "kit"],
+        "b": ["a b c", " ".join(str(i) for i in range(100)), "149", "x y", "kit", "", "12", "kit"],
+    })
+
+    tokens = tokenize(df["a"], df["b"])
+
+    expected = df.apply(jaccard_similarity, args=("a", "b"), axis=1).to_numpy()
+    np.testing.assert_array_equal(jaccard_scores(tokens, *tokens.codes), expected)
+    np.testing.assert_array_equal(tokens.word_counts[tokens.codes[0]], df["a"].astype(str).str.split().str.len())
+
+
+def test_feature_cache_reuses_matrix_until_data_changes(tmp_path, monkeypatch):
+    df = _pairs(500)
+    features, labels, groups = cached_features(df, str(tmp_path))
+
+    # A second run over the same data is served from the cache without featurizing.
+    monkeypatch.setattr(feature_cache, "compute_feature_matrix_parallel", None)
+    cached, cached_labels, cached_groups = cached_features(df, str(tmp_path))
+    assert isinstance(cached, np.memmap)
+    np.testing.assert_array_equal(cached, features)
+    np.testing.assert_array_equal(cached_labels, labels)
+    np.testing.assert_array_equal(cached_groups, groups)
+
+    assert data_fingerprint(df) == data_fingerprint(df.copy())
+    changed = df.copy()
+    changed.iloc[0, changed.columns.get_loc("other.mpns")] = ["x1"]
+    assert data_fingerprint(changed) != data_fingerprint(df)
+
+
+def test_feature_cache_hits_return_labels_and_groups_as_misses_do(tmp_path):
+    df = _pairs(200)
+    df.loc[df.index[:3], "decision"] = np.nan
+    # Integer, string and float group ids, the latter two with missing ones.
+    string_groups = df.assign(matching_engine_candidate_id=df["matching_engine_candidate_id"].astype(str))
+    float_groups = df.assign(matching_engine_candidate_id=df["matching_engine_candidate_id"].astype(float))
+    string_groups.loc[string_groups.index[:3], "matching_engine_candidate_id"] = np.nan
+    float_groups.loc[float_groups.index[:3], "matching_engine_candidate_id"] = np.nan
+
+    for i, frame in enumerate([df, string_groups, float_groups]):
+        miss = cached_features(frame, str(tmp_path))
+        hit = cached_features(frame, str(tmp_path))
+        assert len(list(tmp_path.iterdir())) == i + 1
+        for missed, cached in zip(miss[1:], hit[1:]):
+            assert cached.dtype == missed.dtype
+            pd.testing.assert_series_equal(pd.Series(cached), pd.Series(missed))
+        assert pd.isna(hit[1][:3]).all()
+
+
+def test_pairwise_features_are_computed_once_per_distinct_pair():
+    df = _pairs(1000)
+    # The same groups again under other candidate ids, as products recur across groups in production.
+    repeated = pd.concat([df, df.assign(matching_engine_candidate_id=df["matching_engine_candidate_id"] + 10 ** 6)], ignore_index=True)
+
+    features = compute_feature_matrix(repeated)
+    np.testing.assert_array_equal(features[len(df):], features[:len(df)])
+    np.testing.assert_array_equal(features[:len(df)], compute_feature_matrix(df))
+
+    calls = []
+    codes = np.array([3, 1, 3, 1, 2])
+    result = per_distinct_pair(lambda rows: calls.append(rows) or codes[rows] * 10, codes, np.array([0, 0, 0, 0, 1]))
+    np.testing.assert_array_equal(calls[0], [0, 1, 4])
+    np.testing.assert_array_equal(result, codes * 10)
+
+    # The -1 of a missing value is a distinct input, (1, -1) and (0, 2) would share a key without the shift.
+    lead, other = np.array([0, 1, 1]), np.array([2, -1, -1])
+    result = per_distinct_pair(lambda rows: lead[rows] * 10 + other[rows], lead, other)
+    np.testing.assert_array_equal(result, [2, 9, 9])
+
+
+def test_group_index_statistics_match_groupby():
+    rng = np.random.default_rng(0)
+    keys = pd.Series(rng.integers(0, 50, 2000)).astype(float)
+    keys[::97] = np.nan
+    values = rng.integers(0, 5, 2000).astype(float)
+    values[::13] = np.nan
+    # A group of only missing values.
+    keys[keys == 7] = 7.5
+    values[(keys == 7.5).to_numpy()] = np.nan
+
+    groups = GroupIndex(keys)
+    grouped = pd.Series(values).groupby(keys)
+    for statistic in STATISTICS:
+        expected = grouped.rank() if statistic == "rank" else grouped.transform(statistic)
+        np.testing.assert_allclose(groups.aggregate(statistic, values), expected.to_numpy(), err_msg=statistic)
+
+    with pytest.raises(ValueError):
+        groups.aggregate("median", values)
+    assert len(GroupIndex(pd.Series([], dtype=object)).rank(np.array([]))) == 0
+
+
+def test_product_codes_and_mpn_scores_match_row_wise_on_edge_cases():
+    lists = [[], ["ab123"], ["ab123", ""], ["ab1234567"], ["xab1234567y", "zz"], ["zz"], ["ab123", "cd456"]]
+    rng = np.random.default_rng(1)
+    n = 400
+    df = pd.DataFrame({
+        column: [lists[i] for i in rng.integers(0, len(lists), n)]
+        for column in ["lead.mpns", "other.mpns", "lead.model_nos", "other.model_nos"]
+    })
+    # Stringified lists, as read back from CSV.
+    df.loc[::5, "other.mpns"] = "[AB-123, x]"
+    names = ["kit ab12 pro", "Ünï2 kit", "x9 y7 kit", "kit", np.nan, "ab12", "², a²b x1"]
+    df["lead.name"] = [names[i] for i in rng.integers(0, len(names), n)]
+    df["other.name"] = [names[i] for i in rng.integers(0, len(names), n)]
+
+    expected = df.apply(mpn_match, axis=1).to_numpy()
+    np.testing.assert_array_equal(mpn_match_scores(df), expected)
+    assert len(set(expected)) == 3
+
+    expected = df.apply(is_product_code_in_pair, axis=1).to_numpy(dtype=bool)
+    np.testing.assert_array_equal(product_code_in_pair(df["lead.name"], df["other.name"]), expected)
+    for name in names[:-1] + ["a\x1cb1 c2\td"]:
+        assert product_codes(name) == ([t for t in name.split() if is_string_like_product_code(t)] if isinstance(name, str) else [])
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cms_auto_approval.hashing import METADATA, SAMPLED, hash_dataframe
+
+
+def _frame(n_rows=1000) -> pd.DataFrame:
+    return pd.DataFrame({
+        "id": np.arange(n_rows),
+        "confidence": np.linspace(0, 1, n_rows),
+        "name": [f"product {i}" for i in range(n_rows)],
+        "mpns": [[f"m{i}", "x"] if i % 3 else [] for i in range(n_rows)],
+    })
+
+
+def test_hash_is_stable_and_sees_list_cells():
+    df = _frame()
+    assert hash_dataframe(df) == hash_dataframe(df.copy())
+    assert len(hash_dataframe(df)) == 32
+
+    changed = df.copy()
+    changed.at[500, "mpns"] = ["m500", "y"]
+    assert hash_dataframe(changed) != hash_dataframe(df)
+
+    # A list is not confused with the string it would be joined into.
+    assert hash_dataframe(pd.DataFrame({"a": [["x"]]})) != hash_dataframe(pd.DataFrame({"a": ["x"]}))
+
+
+def test_index_and_columns():
+    df = _frame()
+    shifted = df.set_index(df.index + 1)
+    assert hash_dataframe(shifted) != hash_dataframe(df)
+    assert hash_dataframe(shifted, index=False) == hash_dataframe(df, index=False)
+
+    changed = df.copy()
+    changed.at[0, "name"] = "other"
+    assert hash_dataframe(changed, columns=["id", "mpns"]) == hash_dataframe(df, columns=["id", "mpns"])
+
+
+def test_fast_modes():
+    df = _frame()
+    changed = df.copy()
+    changed.at[1, "name"] = "other"
+
+    assert hash_dataframe(df, mode=SAMPLED, sample_rows=10) == hash_dataframe(changed, mode=SAMPLED, sample_rows=10)
+    assert hash_dataframe(df, mode=SAMPLED, sample_rows=10) != hash_dataframe(df.iloc[:-1], mode=SAMPLED, sample_rows=10)
+    assert hash_dataframe(df, mode=METADATA) == hash_dataframe(changed, mode=METADATA)
+    assert hash_dataframe(df, mode=METADATA) != hash_dataframe(df.astype({"id": float}), mode=METADATA)
+
+    with pytest.raises(ValueError):
+        hash_dataframe(df, mode="fast")
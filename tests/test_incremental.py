@@ -0,0 +1,41 @@
+import numpy as np
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval import incremental
+from src.cms_auto_approval.incremental import MARKER, add_delta, list_dates, load_history
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import compute_feature_matrix
+
+
+def _delta(day: int):
+    df = make_mumford_export(500, seed=day)
+    # Group ids are unique across days in the real export.
+    df["matching_engine_candidate_id"] += day * 1000
+    return df
+
+
+def test_history_appends_deltas_in_date_order(tmp_path):
+    history = str(tmp_path / "history")
+    deltas = {"2024-01-02": _delta(2), "2024-01-01": _delta(1)}
+    for date, df in deltas.items():
+        add_delta(df.copy(), date, history)
+
+    assert list_dates(history) == ["2024-01-01", "2024-01-02"]
+    features, labels, groups = load_history(history)
+
+    pairs = [preprocess_mumford_data(deltas[date].copy()) for date in sorted(deltas)]
+    np.testing.assert_array_equal(features, np.concatenate([compute_feature_matrix(p) for p in pairs]))
+    np.testing.assert_array_equal(labels, np.concatenate([p["decision"].to_numpy() for p in pairs]).astype(str))
+    np.testing.assert_array_equal(groups, np.concatenate([p["matching_engine_candidate_id"].to_numpy() for p in pairs]))
+
+    assert len(load_history(history, since="2024-01-02")[0]) == len(pairs[1])
+
+
+def test_stale_partitions_are_refeaturized(tmp_path, monkeypatch):
+    history = str(tmp_path / "history")
+    add_delta(_delta(1), "2024-01-01", history)
+    expected = load_history(history)[0].copy()
+
+    monkeypatch.setattr(incremental, "feature_code_hash", lambda: "new feature code")
+    np.testing.assert_array_equal(load_history(history)[0], expected)
+    assert (tmp_path / "history" / "date=2024-01-01" / MARKER).read_text() == "new feature code"
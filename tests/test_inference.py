@@ -0,0 +1,32 @@
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.inference import OnlineScorer
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import compute_feature_matrix
+from src.cms_auto_approval.pipelines.data_science_mumford_data.scoring import OnnxScorer, export_onnx
+
+
+def test_online_scores_match_training_transforms():
+    export = make_mumford_export(1000)
+    export = export[export["decision"] != "ERRORED"]
+    pairs = preprocess_mumford_data(export.copy())
+    features = compute_feature_matrix(pairs)
+    model = GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=0).fit(features, pairs["decision"])
+    model_bytes = export_onnx(model)
+
+    expected = OnnxScorer(model_bytes).score(pairs)
+    scored = OnlineScorer(model_bytes).score(export.drop(columns="decision"))
+
+    np.testing.assert_array_equal(scored["matching_engine_candidate_id"], pairs["matching_engine_candidate_id"])
+    np.testing.assert_array_equal(scored["other.external_id"], pairs["other.external_id"])
+    np.testing.assert_allclose(scored["approval_probability"], expected["approval_probability"])
+    np.testing.assert_array_equal(scored["decision"], expected["decision"])
+
+
+def test_online_scorer_handles_a_lone_lead():
+    export = make_mumford_export(1)
+    model = GradientBoostingClassifier(n_estimators=5).fit(np.random.rand(20, 14), ["APPROVED", "DEFERRED"] * 10)
+
+    assert OnlineScorer(export_onnx(model)).score(export).empty
@@ -0,0 +1,80 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval import micro_batching
+from src.cms_auto_approval.inference import OnlineScorer
+from src.cms_auto_approval.micro_batching import MicroBatchScorer
+from src.cms_auto_approval.pipelines.data_science_mumford_data.scoring import export_onnx
+
+
+def _scorer() -> OnlineScorer:
+    model = GradientBoostingClassifier(n_estimators=5, random_state=0)
+    model.fit(np.random.default_rng(0).random((40, 14)), ["APPROVED", "DEFERRED"] * 20)
+    return OnlineScorer(export_onnx(model))
+
+
+def test_concurrent_requests_are_batched_and_routed_back(monkeypatch):
+    scorer = _scorer()
+
+    # Every request reuses the same group ids, so they have to be kept apart within a batch.
+    requests = [make_mumford_export(12, seed=seed, group_size=4).drop(columns="decision") for seed in range(10)]
+    # Missing group ids stay within their own request.
+    for i in (0, 3):
+        requests[i].loc[4:7, "matching_engine_candidate_id"] = np.nan
+
+    batch_sizes = []
+    score_batch = micro_batching._score_batch
+    monkeypatch.setattr(
+        micro_batching, "_score_batch", lambda s, batch: batch_sizes.append(sum(map(len, batch))) or score_batch(s, batch)
+    )
+
+    async def run():
+        batcher = MicroBatchScorer(scorer, max_batch_size=40, max_wait=0.05)
+        results = await asyncio.gather(*(batcher.score(groups) for groups in requests))
+        await batcher.close()
+        return results
+
+    results = asyncio.run(run())
+
+    assert sum(batch_sizes) == 120
+    assert max(batch_sizes) <= 40 and len(batch_sizes) < len(requests)
+    for groups, result in zip(requests, results):
+        pd.testing.assert_frame_equal(result, scorer.score(groups), check_dtype=False)
+
+
+def test_close_resolves_every_outstanding_request():
+    requests = [make_mumford_export(12, seed=seed, group_size=4).drop(columns="decision") for seed in range(3)]
+
+    async def run():
+        # A long max_wait keeps the collector gathering the batch when close is called.
+        batcher = MicroBatchScorer(_scorer(), max_batch_size=30, max_wait=60)
+        calls = [asyncio.ensure_future(batcher.score(groups)) for groups in requests]
+        await asyncio.sleep(0.05)
+        await batcher.close()
+        return await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 5)
+
+    # The first two requests fill a batch that is scored, the third is still being collected and is cancelled.
+    results = asyncio.run(run())
+    assert [type(result) for result in results] == [pd.DataFrame, pd.DataFrame, asyncio.CancelledError]
+
+
+def test_a_failing_request_does_not_fail_its_batch():
+    scorer = _scorer()
+    requests = [make_mumford_export(12, seed=seed, group_size=4).drop(columns="decision") for seed in range(4)]
+    requests[1]["confidence"] = "high"
+    requests[3] = requests[3].drop(columns="attrs")
+
+    async def run():
+        batcher = MicroBatchScorer(scorer, max_batch_size=100, max_wait=0.05)
+        results = await asyncio.gather(*(batcher.score(groups) for groups in requests), return_exceptions=True)
+        await batcher.close()
+        return results
+
+    results = asyncio.run(run())
+    assert isinstance(results[1], ValueError) and isinstance(results[3], KeyError)
+    for i in (0, 2):
+        pd.testing.assert_frame_equal(results[i], scorer.score(requests[i]), check_dtype=False)
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data import models
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import FEATURE_COLUMNS, compute_feature_matrix
+from src.cms_auto_approval.pipelines.data_science_mumford_data.models import HIST_GRADIENT_BOOSTING, fit_backend
+from src.cms_auto_approval.pipelines.data_science_mumford_data.nodes import tune_model
+from src.cms_auto_approval.pipelines.data_science_mumford_data.scoring import OnnxScorer, export_onnx
+from src.cms_auto_approval.pipelines.data_science_mumford_data.search import search_configs
+
+
+def test_hist_gradient_boosting_stops_early_and_exports(monkeypatch):
+    monkeypatch.setattr(models, "MAX_ITER", 200)
+    pairs = preprocess_mumford_data(make_mumford_export(3000))
+    x = pd.DataFrame(compute_feature_matrix(pairs), columns=FEATURE_COLUMNS)
+    y = pairs["decision"].to_numpy()
+
+    model = fit_backend(HIST_GRADIENT_BOOSTING, x, y, pairs["matching_engine_candidate_id"].to_numpy(), n_threads=1)
+
+    assert 0 < model.n_iter_ < 200
+    expected = model.predict_proba(x)[:, list(model.classes_).index("APPROVED")]
+    np.testing.assert_allclose(OnnxScorer(export_onnx(model)).approval_probabilities(x.to_numpy()), expected, atol=1e-5)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        fit_backend("random_forest", pd.DataFrame(), np.array([]), np.array([]))
+
+
+def test_search_prunes_trials_fold_by_fold():
+    pairs = preprocess_mumford_data(make_mumford_export(1500))
+    features = compute_feature_matrix(pairs)
+    configs = [{"n_estimators": 5}, {"n_estimators": 20, "max_depth": 2}, {"n_estimators": 50, "max_depth": 3}]
+
+    trials = search_configs(
+        features, pairs["decision"].to_numpy(), pairs["matching_engine_candidate_id"].to_numpy(), configs,
+        n_splits=3, prune_fraction=0.5, n_jobs=2,
+    )
+
+    assert sorted(trials["folds"]) == [1, 2, 3]
+    assert trials["folds"][0] == 3 and trials["config"][0] in configs
+    assert tune_model(pairs, {}) == {}
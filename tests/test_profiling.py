@@ -0,0 +1,98 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.profiling import Profiler, RunProfiler, active_profiler, profile_run, profiled
+
+
+@profiled()
+def _double(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.concat([df, df])
+
+
+def test_steps_nest_and_record_rows(tmp_path):
+    export = make_mumford_export(500)
+    assert len(_double(export)) == 1000  # no active profiler, nothing recorded
+
+    profiler = Profiler(profile_dir=str(tmp_path))
+    with profiler.activate():
+        with profiler.step("run") as record:
+            pairs = preprocess_mumford_data(export)
+            _double(pairs)
+            record["rows_out"] = 1
+
+    frame = profiler.to_frame().set_index("step")
+    assert list(frame.index) == [
+        "run",
+        "run/preprocess_mumford_data",
+        "run/preprocess_mumford_data/preprocess_products",
+        "run/preprocess_mumford_data/preprocess_pairs",
+        "run/_double",
+    ]
+    assert frame.loc["run/preprocess_mumford_data", "rows_in"] == 500
+    assert frame.loc["run/preprocess_mumford_data", "rows_out"] == len(pairs)
+    assert frame.loc["run/_double", "rows_out"] == 2 * len(pairs)
+    assert (frame["cpu_seconds"] >= 0).all()
+    assert (frame["peak_rss_mb"] >= frame["start_rss_mb"]).all()
+    assert frame.loc["run", "wall_seconds"] >= frame.loc["run/preprocess_mumford_data", "wall_seconds"]
+
+    # Only the outermost step is profiled with cProfile.
+    assert [p.name for p in tmp_path.iterdir()] == ["run.prof"]
+    assert profiler.metrics()["run/_double.rows_in"] == len(pairs)
+
+
+def test_profile_run_records_the_run():
+    @profile_run
+    def run(n_rows: int) -> np.ndarray:
+        return _double(pd.DataFrame({"a": range(n_rows)})).to_numpy()
+
+    assert run.__annotations__ == {"n_rows": int, "return": np.ndarray}
+    assert len(run(3)) == 6
+
+
+def test_run_profiler_keeps_threaded_nodes_apart():
+    hooks = RunProfiler()
+    hooks.before_pipeline_run()
+    started = threading.Barrier(2)
+
+    def run_node(name: str, rows: int):
+        node = SimpleNamespace(name=name)
+        hooks.before_node_run(node, {"df": pd.DataFrame({"a": range(rows)})})
+        started.wait()  # both nodes are in flight before either finishes
+        hooks.after_node_run(node, {"out": np.zeros(rows * 2)})
+
+    threads = [threading.Thread(target=run_node, args=(name, rows)) for name, rows in [("a", 3), ("b", 5)]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    hooks.after_pipeline_run()
+
+    frame = hooks.profiler.to_frame().set_index("step")
+    assert sorted(frame.index) == ["a", "b"]
+    assert frame.loc["a", "rows_out"] == 6 and frame.loc["b", "rows_out"] == 10
+    assert active_profiler() is None
+
+
+def test_run_profiler_closes_the_profiler_after_an_error():
+    hooks = RunProfiler()
+    hooks.before_pipeline_run()
+    failed, running = SimpleNamespace(name="failed"), SimpleNamespace(name="running")
+    hooks.before_node_run(running, {})
+    hooks.before_node_run(failed, {})
+    assert active_profiler() is hooks.profiler
+
+    error = ValueError("node failed")
+    hooks.on_node_error(error, failed)
+    hooks.on_pipeline_error(error)
+
+    assert active_profiler() is None
+    frame = hooks.profiler.to_frame().set_index("step")
+    assert list(frame.index) == ["running", "running/failed"]
+    assert frame["wall_seconds"].notna().all()
+    assert hooks.profiler.current_step() is None
+    hooks.on_pipeline_error(error)  # a second call is harmless
@@ -0,0 +1,24 @@
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier
+
+from benchmarks.synthetic import make_mumford_export
+from src.cms_auto_approval.pipelines.data_engineering_mumford_data.nodes import preprocess_mumford_data
+from src.cms_auto_approval.pipelines.data_science_mumford_data.features import compute_feature_matrix
+from src.cms_auto_approval.pipelines.data_science_mumford_data.scoring import OnnxScorer, decide, export_onnx
+
+
+def test_onnx_scorer_matches_model_on_any_batch_size():
+    pairs = preprocess_mumford_data(make_mumford_export(2000))
+    features = compute_feature_matrix(pairs)
+    model = GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=0)
+    model.fit(features, pairs["decision"])
+    expected = model.predict_proba(features)[:, list(model.classes_).index("APPROVED")]
+
+    scorer = OnnxScorer(export_onnx(model), batch_size=256)
+    np.testing.assert_allclose(scorer.approval_probabilities(features), expected, atol=1e-5)
+    np.testing.assert_allclose(scorer.approval_probabilities(features[:1]), expected[:1], atol=1e-5)
+
+    scored = scorer.score(pairs)
+    assert scored.index.equals(pairs.index)
+    np.testing.assert_array_equal(scored["decision"], decide(scored["approval_probability"].to_numpy()))
+    assert set(scored["decision"]) <= {"APPROVED", "DEFERRED"}